@@ -7,6 +7,15 @@ import argparse
 import math
 from collections import namedtuple
 import time
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import rotation
+from raster import matrix4
+import numpy as np
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y', 'z'])
@@ -20,32 +29,6 @@ class UnitVector(object):
         self.z = z / det
 
 
-def sign(number):
-    """
-    Return signum(`number`)
-        -1 if `number` < 0,
-        +1 if `number` > 0,
-        0 if `number` == 0)
-    """
-    return int(math.copysign(1, number))
-
-
-def plot(point, color=(0, 0, 0)):
-    """
-    Plot a colored pixel at (`x`, `y`)
-    `color` is specified as (R, G, B) with each value ranging till 255
-    """
-    surface.set_at((point.x, point.y), color)
-
-
-def irange(start, end, abs_delta=1):
-    """
-    Return an inclusive 'range()' generator in steps of `abs_delta`
-    """
-    diff = end - start
-    return range(start, end + sign(diff), sign(diff) * abs_delta)
-
-
 def translate(points, shift_x, shift_y, shift_z):
     """
     Translate either a single 'Point()' or an iterable of 'Point()'s
@@ -74,113 +57,43 @@ def scale(points, scale_x, scale_y, scale_z):
         yield Point(point.x * scale_x, point.y * scale_y, point.z * scale_z)
 
 
-def rotate(points, angle, axis):
-    """
-    Rotates either a single 'Point()' or an iterable of 'Point()'s about `axis`
-    by `angle` (in radians).
-    Return:
-        iterable of rotated 'Point()'s
-    """
-    if isinstance(points, Point):
-        iter_points = iter((points,))
-    else:
-        iter_points = iter(points)
-    l = axis.x
-    m = axis.y
-    n = axis.z
-    matrix = [[l * l * (1 - math.cos(angle)) + 1 * math.cos(angle),
-               m * l * (1 - math.cos(angle)) - n * math.sin(angle),
-               n * l * (1 - math.cos(angle)) + m * math.sin(angle)],
-              [l * m * (1 - math.cos(angle)) + n * math.sin(angle),
-               m * m * (1 - math.cos(angle)) + 1 * math.cos(angle),
-               n * m * (1 - math.cos(angle)) - l * math.sin(angle)],
-              [l * n * (1 - math.cos(angle)) - m * math.sin(angle),
-               m * n * (1 - math.cos(angle)) + l * math.sin(angle),
-               n * n * (1 - math.cos(angle)) + 1 * math.cos(angle)]]
-    for point in iter_points:
-        yield Point((matrix[0][0] * point.x +
-                     matrix[0][1] * point.y +
-                     matrix[0][2] * point.z),
-                    (matrix[1][0] * point.x +
-                     matrix[1][1] * point.y +
-                     matrix[1][2] * point.z),
-                    (matrix[2][0] * point.x +
-                     matrix[2][1] * point.y +
-                     matrix[2][2] * point.z))
-
-
-def rotate_faces(faces, angle, axis):
+def rotate(angle, axis):
     """
-    Convenience wrapper to rotate faces defined as an iterable of 'Point()'s
-    about `axis` by `angle` radians.
-    Returns:
-        iterable of iterables of rotated face 'Point()'s
+    Returns the 'Matrix4()' rotating about the unit vector `axis` by `angle`
+    (in radians), with Rodrigues' rotation formula
     """
-    return (rotate(face, angle, axis) for face in faces)
+    return matrix4.Matrix4.rotation(angle, axis)
 
 
-def intify(points):
+def perspective_project(cam, screen_z):
     """
-    Round `points` (which can be a single 'Point()' or an iterable of
-    'Point()'s) coordinates to integers.
-    Return:
-        iterable of 'Point()'s
+    Returns the 'Matrix4()' of the perspective projection onto a screen
+    parallel to the XY plane with Z coordinate `screen_z`, and center of
+    projection as `cam`, i.e.
+        x = cam.x + (screen_z - cam.z) * (cam.x - x) / (z - cam.z)
+    (and the same for y)
     """
-    if isinstance(points, Point):
-        iter_points = iter((points,))
-    else:
-        iter_points = iter(points)
-    for point in iter_points:
-        yield Point(int(round(point.x)),
-                    int(round(point.y)),
-                    int(round(point.z)))
+    return matrix4.Matrix4.perspective_projection(cam, screen_z)
 
 
-def animate(poly_shape, vector, rotation_range):
+def parallel_project(screen_z=0):
     """
-    Animate `poly_shape` (iterable of faces which are themselves iterables of
-    'Point()'s) by rotating it about `vector` in 1 degree steps from 0 to
-    `rotation_range` degrees.
-    Return:
-        iterable of each rotated shape
+    Returns the 'Matrix4()' of the parallel projection onto a screen parallel
+    to the XY plane with Z coordinate `screen_z`
     """
-    for angle in rotation_range:
-        faces = [[point for point in face] for face in
-                 rotate_faces(poly_shape, math.radians(angle), vector)]
-        yield list(faces)
+    return matrix4.Matrix4.parallel_projection(screen_z)
 
 
-def perspective_project(point, cam, screen_z):
+def flatten(points):
     """
-    Returns the perspective projection of `point` onto a screen parallel to the
-    XY plane with Z coordinate `screen_z`, and center of projection as `cam`.
-    Return:
-        'Point()' on the screen
+    Convert an (N, 3) array of projected `points` into an (N, 2) array of
+    integer screen coordinates
     """
-    x = cam.x + ((screen_z - cam.z) * (cam.x - point.x) / (point.z - cam.z))
-    y = cam.y + ((screen_z - cam.z) * (cam.y - point.y) / (point.z - cam.z))
-    return Point(x, y, screen_z)
-
-
-def parallel_project(point, screen_z=0):
-    """
-    Returns the parallel projection of `point` onto a screen parallel to the
-    XY plane.
-    Return:
-        'Point()' on the screen
-    """
-    return Point(point.x, point.y, screen_z)
-
-
-def flatten(point):
-    """
-    Convert a 3D 'Point()' `point` into a tuple of screen coordinates
-    """
-    point = list(intify(point))[0]
-    return (point.x, point.y)
+    return np.rint(points[:, :2]).astype(int)
 
 
 def main(args):
+    rotation.default_cache.tables = args.tables
     cam = Point(args.cam_x, args.cam_y, args.cam_z)
     vector = UnitVector(args.VECTOR_X, args.VECTOR_Y, args.VECTOR_Z)
 
@@ -224,30 +137,26 @@ def main(args):
     surface.fill((255, 255, 255))
     pygame.display.update()
 
-    # Get incrementally rotated cubes
-    for cube in animate(cube, vector, range(args.angle + 1)):
-        # Shift it at the center of the screen, and make its Z coordinates
-        # negative.
-        cube = [list(translate(face,
-                               args.window_size // 2,
-                               args.window_size // 2,
-                               -CUBE_SIDE * 1.5)) for face in cube]
-        perspectives = [[perspective_project(point, cam, args.screen_z)
-                         for point in face]
-                        for face in cube]
-        parallels = [[parallel_project(point) for point in face]
-                     for face in cube]
-
-        # Shift projections to appear side by side
-        perspectives = [list(translate(face, +CUBE_SIDE * 1, 0, 0))
-                        for face in perspectives]
-        parallels = [list(translate(face, -CUBE_SIDE * 1, 0, 0))
-                     for face in parallels]
-
-        # Convert to tuples as pygame.draw takes only 2d tuples
-        parallels = [[flatten(point) for point in face] for face in parallels]
-        perspectives = [[flatten(point) for point in face]
-                        for face in perspectives]
+    # Get incrementally rotated cubes, projected a frame at a time
+    vertices = np.array(cube, dtype=np.float64).reshape(-1, 3)
+    stack = matrix4.MatrixStack()
+    for angle in range(args.angle + 1):
+        # Rotate it, shift it at the center of the screen, and make its Z
+        # coordinates negative.
+        stack.load(rotate(math.radians(angle), vector))
+        stack.translate(args.window_size // 2, args.window_size // 2,
+                        -CUBE_SIDE * 1.5)
+        # Project it, shifting the projections to appear side by side
+        stack.push()
+        perspectives = flatten(stack.then(perspective_project(
+            cam, args.screen_z)).translate(+CUBE_SIDE * 1, 0, 0).apply(
+                vertices))
+        stack.pop()
+        parallels = flatten(stack.then(parallel_project()).translate(
+            -CUBE_SIDE * 1, 0, 0).apply(vertices))
+        # Convert to lists of tuples as pygame.draw takes only 2d tuples
+        perspectives = perspectives.reshape(len(cube), -1, 2).tolist()
+        parallels = parallels.reshape(len(cube), -1, 2).tolist()
         # Plot the points
         for polygon in perspectives:
             pygame.draw.polygon(surface, (0, 0, 0), polygon, 4)
@@ -297,6 +206,10 @@ if __name__ == '__main__':
                         type=int,
                         help="Angle to rotate in degrees",
                         default=360)
+    parser.add_argument("--tables",
+                        action="store_true",
+                        help="Take the sines and cosines of the whole degree "
+                             "rotations from tables")
     parser.add_argument("--window-size", "-w",
                         type=int,
                         default=1000,
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the line, circle and ellipse rasterizers in pixels per second,
+with pygame.draw as the baseline, and writes a JSON report
+"""
+import pygame
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+# Make the algorithm directories in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import bresanham_line.bresanham_line as bresanham_line
+import dda.dda as dda
+import circle.bresenham_circle as bresenham_circle
+import ellipse.ellipse as ellipse
+
+LENGTHS = (10, 100, 1000, 10000, 100000)
+RADII = (1, 10, 100, 1000, 10000, 50000)
+
+# Directions of the benchmarked lines, one per octant, as (x, y) multiples of
+# the line length (2 to 1 slopes, so every octant is clearly inside one)
+OCTANTS = {
+    'ESE': (2, 1), 'SSE': (1, 2), 'SSW': (-1, 2), 'WSW': (-2, 1),
+    'WNW': (-2, -1), 'NNW': (-1, -2), 'NNE': (1, -2), 'ENE': (2, -1),
+}
+
+# Largest surface that pygame.draw baselines are timed on, longer primitives
+# are reported without a baseline
+MAX_SURFACE_SIZE = 4096
+
+WHITE = (255, 255, 255)
+
+
+def best_time(function, min_time=0.05, max_repeat=100):
+    """
+    Call `function` repeatedly until `min_time` seconds have passed (or
+    `max_repeat` calls were made)
+    Return:
+        (fastest time of a call in seconds, the last result of `function`)
+    """
+    best = float('inf')
+    spent = 0.0
+    for _ in range(max_repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= min_time:
+            break
+    return best, result
+
+
+def count_pixels(surface):
+    """
+    Return the number of pixels drawn on a black `surface`
+    """
+    return int(np.count_nonzero(pygame.surfarray.pixels2d(surface)))
+
+
+def result(primitive, algorithm, size, pixels, seconds, **extra):
+    """
+    Return a benchmark result record
+    """
+    record = {
+        'primitive': primitive,
+        'algorithm': algorithm,
+        'size': size,
+        'pixels': pixels,
+        'seconds': seconds,
+        'pixels_per_second': pixels / seconds if seconds else None,
+    }
+    record.update(extra)
+    return record
+
+
+def line_algorithms():
+    """
+    Return the line rasterizers as a dict of name to function(start, end)
+    giving the number of pixels produced
+    """
+    return {
+        'dda': lambda start, end: len(list(dda.dda(start, end))),
+        'dda_fixed': lambda start, end: len(list(dda.dda_fixed(start, end))),
+        'dda_numpy': lambda start, end: len(dda.dda_numpy(start, end)[0]),
+        'bresanham': lambda start, end: len(list(
+            bresanham_line.bresanham(start, end))),
+        'bresanham_spans': lambda start, end: sum(
+            max(abs(span.x1 - span.x0), abs(span.y1 - span.y0)) + 1
+            for span in bresanham_line.bresanham_spans(start, end)),
+        'bresanham_many': lambda start, end: len(
+            bresanham_line.bresanham_many([start], [end])[0]),
+    }
+
+
+def benchmark_lines(lengths=LENGTHS, algorithms=None, min_time=0.05):
+    """
+    Time every line rasterizer (or only those named in `algorithms`) over a
+    line in every octant for each of `lengths` (in pixels along the major
+    axis), and pygame.draw.line as the baseline
+    Return:
+        list of result records
+    """
+    results = []
+    for name, rasterize in line_algorithms().items():
+        if algorithms and name not in algorithms:
+            continue
+        for length in lengths:
+            for octant, (x, y) in OCTANTS.items():
+                start = bresanham_line.Point(0, 0)
+                end = bresanham_line.Point(x * length // 2, y * length // 2)
+                seconds, pixels = best_time(lambda: rasterize(start, end),
+                                            min_time)
+                results.append(result('line', name, length, pixels, seconds,
+                                      octant=octant))
+
+    if algorithms and 'pygame' not in algorithms:
+        return results
+    for length in lengths:
+        if length >= MAX_SURFACE_SIZE:
+            continue
+        surface = pygame.Surface((length + 1, length + 1))
+        for octant, (x, y) in OCTANTS.items():
+            # Start at the corner the line goes away from
+            start = (0 if x > 0 else length, 0 if y > 0 else length)
+            end = (start[0] + x * length // 2, start[1] + y * length // 2)
+            surface.fill((0, 0, 0))
+            seconds, _ = best_time(
+                lambda: pygame.draw.line(surface, WHITE, start, end), min_time)
+            results.append(result('line', 'pygame', length,
+                                  count_pixels(surface), seconds,
+                                  octant=octant))
+    return results
+
+
+def benchmark_circles(radii=RADII, algorithms=None, min_time=0.05):
+    """
+    Time `circle()` and `circle_numpy()` for each of `radii` and
+    pygame.draw.circle as the baseline
+    Return:
+        list of result records
+    """
+    results = []
+    for radius in radii:
+        if not algorithms or 'circle' in algorithms:
+            seconds, pixels = best_time(
+                lambda: len(list(bresenham_circle.circle(radius))), min_time)
+            results.append(result('circle', 'circle', radius, pixels, seconds))
+        if not algorithms or 'circle_numpy' in algorithms:
+            seconds, pixels = best_time(
+                lambda: len(bresenham_circle.circle_numpy(radius)[0]),
+                min_time)
+            results.append(result('circle', 'circle_numpy', radius, pixels,
+                                  seconds))
+        if ((not algorithms or 'pygame' in algorithms) and
+                2 * radius + 1 <= MAX_SURFACE_SIZE):
+            surface = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+            seconds, _ = best_time(
+                lambda: pygame.draw.circle(surface, WHITE, (radius, radius),
+                                           radius, 1),
+                min_time)
+            results.append(result('circle', 'pygame', radius,
+                                  count_pixels(surface), seconds))
+    return results
+
+
+def benchmark_ellipses(radii=RADII, algorithms=None, min_time=0.05):
+    """
+    Time `ellipse()` and `ellipse_numpy()` for ellipses with X radius from
+    `radii` and half as large Y radius, and pygame.draw.ellipse as the
+    baseline
+    Return:
+        list of result records
+    """
+    results = []
+    for radius in radii:
+        radius_y = max(radius // 2, 1)
+        if not algorithms or 'ellipse' in algorithms:
+            seconds, pixels = best_time(
+                lambda: len(list(ellipse.ellipse(radius, radius_y))), min_time)
+            results.append(result('ellipse', 'ellipse', radius, pixels,
+                                  seconds, radius_y=radius_y))
+        if not algorithms or 'ellipse_numpy' in algorithms:
+            seconds, pixels = best_time(
+                lambda: len(ellipse.ellipse_numpy(radius, radius_y)[0]),
+                min_time)
+            results.append(result('ellipse', 'ellipse_numpy', radius, pixels,
+                                  seconds, radius_y=radius_y))
+        if ((not algorithms or 'pygame' in algorithms) and
+                2 * radius + 1 <= MAX_SURFACE_SIZE):
+            surface = pygame.Surface((2 * radius + 1, 2 * radius_y + 1))
+            seconds, _ = best_time(
+                lambda: pygame.draw.ellipse(surface, WHITE,
+                                            surface.get_rect(), 1),
+                min_time)
+            results.append(result('ellipse', 'pygame', radius,
+                                  count_pixels(surface), seconds,
+                                  radius_y=radius_y))
+    return results
+
+
+def run(lengths=LENGTHS, radii=RADII, algorithms=None, min_time=0.05):
+    """
+    Run all the benchmarks
+    Return:
+        the report as a dict that can be dumped to JSON
+    """
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'results': (benchmark_lines(lengths, algorithms, min_time) +
+                    benchmark_circles(radii, algorithms, min_time) +
+                    benchmark_ellipses(radii, algorithms, min_time)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--lengths", "-l",
+                        type=int,
+                        nargs="+",
+                        default=LENGTHS,
+                        help="Line lengths in pixels")
+    parser.add_argument("--radii", "-r",
+                        type=int,
+                        nargs="+",
+                        default=RADII,
+                        help="Circle and ellipse radii in pixels")
+    parser.add_argument("--algorithms", "-a",
+                        nargs="+",
+                        default=None,
+                        help="Only run these algorithms (default: all), "
+                             "'pygame' for the baselines")
+    parser.add_argument("--min-time", "-t",
+                        type=float,
+                        default=0.05,
+                        help="Minimum seconds to spend timing each case")
+    parser.add_argument("--output", "-o",
+                        default="benchmark.json",
+                        help="Path of the JSON report")
+    args = parser.parse_args()
+
+    report = run(args.lengths, args.radii, args.algorithms, args.min_time)
+    for record in report['results']:
+        print("{:8} {:16} {:>7} {:4} {:>16,.0f} pixels/s".format(
+            record['primitive'], record['algorithm'], record['size'],
+            record.get('octant', ''), record['pixels_per_second'] or 0))
+    with open(args.output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
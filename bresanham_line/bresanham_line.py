@@ -7,9 +7,22 @@ import argparse
 import math
 from collections import namedtuple
 import time
+import numpy as np
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import framebuffer
+from raster.points import PointBuffer
+from raster import clip as clipping
+from raster import stipple as stippling
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y'])
+# An axis aligned run of pixels from (x0, y0) to (x1, y1), both inclusive
+Span = namedtuple('Span', ['x0', 'y0', 'x1', 'y1'])
 
 def sign(number):
     """
@@ -21,13 +34,6 @@ def sign(number):
     return int(math.copysign(1, number))
 
 
-def plot(point, color=(255, 255, 255)):
-    """
-    Plot a colored pixel at (`x`, `y`)
-    `color` is specified as (R, G, B) with each value ranging till 255
-    """
-    surface.set_at((point.x, point.y), color)
-
 def irange(start, end, abs_delta=1):
     """
     Returns an inclusive range() generator in steps of `abs_delta`
@@ -35,11 +41,47 @@ def irange(start, end, abs_delta=1):
     diff = end - start
     return range(start, end + sign(diff), sign(diff) * abs_delta)
 
-def bresanham_quad0(start, end):
+def quad0_row(xdiff, ydiff, step):
+    """
+    Returns the row (relative to the start point) of the pixel that
+    `bresanham_quad0()` plots at `step` along x, from the closed form of its
+    error parameter decisions
+        ceil((2 * ydiff * (step + 1) - xdiff) / (2 * xdiff))
+    which is 0 for step -1 (the start point)
+    """
+    if xdiff == 0:
+        return 0
+    return -((xdiff - 2 * ydiff * (step + 1)) // (2 * xdiff))
+
+def quad0_steps(xdiff, ydiff, rect):
+    """
+    Returns the (first, last) steps along x of `bresanham_quad0()` from the
+    origin to (`xdiff`, `ydiff`) whose pixels are inside `rect`, found by
+    inverting `quad0_row()`: the line reaches row k (k > 0) at step
+        floor((2 * k - 1) * xdiff / (2 * ydiff))
+    first > last if no step is inside
+    """
+    ydiff_2 = 2 * ydiff
+    if rect.y_max < 0 or (ydiff == 0 and rect.y_min > 0):
+        return 0, -1
+    first = 0
+    if rect.y_min > 0:
+        first = (xdiff * (2 * rect.y_min - 1)) // ydiff_2
+    last = xdiff
+    if ydiff != 0:
+        last = (xdiff * (2 * rect.y_max + 1)) // ydiff_2 - 1
+    return max(first, rect.x_min, 0), min(last, rect.x_max, xdiff)
+
+def bresanham_quad0(start, end, clip=None, pattern=None):
     """
     Returns a generator that gives the line pixel coordinates using Bresenham's
     algorithm, suitable only for the first quadrant and for lines with
     slopes < 1
+    If `clip` is a 'ClipRect()', only the pixels inside it are given, starting
+    with the error parameter of the first visible step instead of walking up
+    to it
+    If `pattern` is a 'Stipple()' only the steps along x that are on in it
+    are given, restarting the error parameter at every run of them
     """
     ydiff = end.y - start.y
     assert(ydiff >= 0)
@@ -47,22 +89,35 @@ def bresanham_quad0(start, end):
     xdiff = end.x - start.x
     assert(xdiff >= 0)
     xdiff_2 = 2 * xdiff
-    # Plot start point
-    yield start
-    error_parameter = ydiff_2 - xdiff
-    y = start.y
+    first, last = 0, xdiff
+    if clip is not None:
+        first, last = quad0_steps(xdiff, ydiff, clipping.ClipRect(
+            clip.x_min - start.x, clip.y_min - start.y,
+            clip.x_max - start.x, clip.y_max - start.y))
     assert(xdiff >= ydiff)
-    for x in irange(start.x, end.x):
-        if error_parameter > 0:
-            y += 1
-            error_parameter -= xdiff_2
-        yield Point(x, y)
-        error_parameter += ydiff_2
+    # Plot start point
+    if ((clip is None or clipping.contains(clip, start)) and
+            (pattern is None or stippling.is_on(pattern, 0))):
+        yield start
+    runs = [(first, last)]
+    if pattern is not None:
+        runs = stippling.on_runs(pattern, first, last)
+    for run_first, run_last in runs:
+        y = start.y + quad0_row(xdiff, ydiff, run_first - 1)
+        error_parameter = (ydiff_2 * (run_first + 1) - xdiff -
+                           xdiff_2 * (y - start.y))
+        for x in range(start.x + run_first, start.x + run_last + 1):
+            if error_parameter > 0:
+                y += 1
+                error_parameter -= xdiff_2
+            yield Point(x, y)
+            error_parameter += ydiff_2
 
-def bresanham(start, end):
+def octant_transforms(start, end):
     """
-    Applies proper input and output transformations to convert the line into
-    first quadrant with slope < 1
+    Returns the (input, output) transformations that convert points of the
+    line from `start` to `end` into the first quadrant with slope < 1 (with
+    `start` at the origin) and back
     The compass directions are given in comments
     +--------+--------+
     |\       |       /|
@@ -84,9 +139,8 @@ def bresanham(start, end):
     |/       |       \|
     +--------+--------+
     """
-    end = Point(end.x - start.x, end.y - start.y)
-    xdiff = end.x
-    ydiff = end.y
+    xdiff = end.x - start.x
+    ydiff = end.y - start.y
     if xdiff >= 0 and ydiff >= 0:
         # SE
         if xdiff >= ydiff:
@@ -127,10 +181,272 @@ def bresanham(start, end):
             # NNW
             transform_in = lambda point: Point(-point.y, -point.x)
             transform_out = transform_in
+    transform_initial = lambda point: transform_in(Point(point.x - start.x,
+                                                         point.y - start.y))
     transform_final = lambda point: Point(transform_out(point).x + start.x,
                                           transform_out(point).y + start.y)
-    return (transform_final(point) for point in
-            bresanham_quad0(Point(0, 0), transform_in(end)))
+    return transform_initial, transform_final
+
+def bresanham(start, end, clip=None, pattern=None):
+    """
+    Applies proper input and output transformations to convert the line into
+    first quadrant with slope < 1 (see `octant_transforms()`)
+    If `clip` is a 'ClipRect()' only the pixels inside it are given, without
+    stepping through the others
+    If `pattern` is a 'Stipple()' only the pixels of the steps along the
+    major axis that are on in it are given, without stepping through the
+    others
+    """
+    transform_in, transform_out = octant_transforms(start, end)
+    if clip is not None:
+        clip = clipping.transform_rect(clip, transform_in)
+    return (transform_out(point) for point in
+            bresanham_quad0(Point(0, 0), transform_in(end), clip, pattern))
+
+def quad0_runs(xdiff, ydiff, clip=None):
+    """
+    Returns the runs of `bresanham_quad0()` from the origin to (`xdiff`,
+    `ydiff`), one per row (run-slice Bresenham), as int64 arrays
+    (run_starts, run_ends, rows) computed in bulk: the line steps up to row k
+    (k > 0) at the x offset
+        floor((2 * k - 1) * xdiff / (2 * ydiff))
+    row 0 always has the start point and (as `bresanham_quad0()` decides
+    before plotting) the last step overshoots the end by a row when
+    2 * ydiff > xdiff.
+    If `clip` is a 'ClipRect()' (relative to the origin) only the rows inside
+    it are computed and their runs are cut to it
+    """
+    ydiff_2 = 2 * ydiff
+    last_row = ydiff + 1 if ydiff_2 > xdiff else ydiff
+    x_min, x_max = 0, xdiff
+    first_row, end_row = 0, last_row
+    if clip is not None:
+        x_min = max(x_min, clip.x_min)
+        x_max = min(x_max, clip.x_max)
+        if x_min <= x_max:
+            first_row = max(clip.y_min, 0 if x_min == 0 else
+                            quad0_row(xdiff, ydiff, x_min))
+            end_row = min(clip.y_max, quad0_row(xdiff, ydiff, x_max))
+        else:
+            first_row, end_row = 0, -1
+    rows = np.arange(first_row, end_row + 2, dtype=np.int64)
+    run_starts = (xdiff * (2 * rows - 1)) // max(ydiff_2, 1)
+    run_starts[rows == 0] = 0
+    run_ends = np.maximum(run_starts[1:] - 1, run_starts[:-1])
+    rows, run_starts = rows[:-1], run_starts[:-1]
+    run_ends[rows == last_row] = xdiff
+    run_starts = np.maximum(run_starts, x_min)
+    run_ends = np.minimum(run_ends, x_max)
+    inside = run_starts <= run_ends
+    return run_starts[inside], run_ends[inside], rows[inside]
+
+def bresanham_spans_quad0(start, end, clip=None):
+    """
+    Returns a generator that gives the pixels of `bresanham_quad0()` as one
+    horizontal 'Span()' per row (see `quad0_runs()`)
+    If `clip` is a 'ClipRect()' only the rows inside it are visited and their
+    spans are cut to it
+    """
+    xdiff, ydiff = end.x - start.x, end.y - start.y
+    assert(0 <= ydiff <= xdiff)
+    if clip is not None:
+        clip = clipping.ClipRect(clip.x_min - start.x, clip.y_min - start.y,
+                                 clip.x_max - start.x, clip.y_max - start.y)
+    for x0, x1, y in zip(*(run.tolist() for run in
+                           quad0_runs(xdiff, ydiff, clip))):
+        yield Span(start.x + x0, start.y + y, start.x + x1, start.y + y)
+
+def bresanham_spans(start, end, clip=None):
+    """
+    Returns a generator that gives the pixels of `bresanham()` as 'Span()'s,
+    horizontal runs for lines with slope < 1 and vertical runs otherwise
+    If `clip` is a 'ClipRect()' only the parts of the spans inside it are given
+    Near 45 degrees the runs are 1 or 2 pixels long, so there are about as
+    many spans as pixels and nothing is saved over `bresanham()` by deciding
+    once per run. To not be slower there, all runs are computed in bulk by
+    `quad0_runs()` and folded back to the octant of the line with one integer
+    matrix, instead of through the per point transformations of
+    `octant_transforms()` for every span.
+    """
+    transform_in, transform_out = octant_transforms(start, end)
+    if clip is not None:
+        clip = clipping.transform_rect(clip, transform_in)
+    folded_end = transform_in(end)
+    run_starts, run_ends, rows = quad0_runs(folded_end.x, folded_end.y, clip)
+    # transform_out is linear plus the shift to `start`
+    origin = transform_out(Point(0, 0))
+    unit_x = transform_out(Point(1, 0))
+    unit_y = transform_out(Point(0, 1))
+    (xx, yx), (xy, yy) = ((unit_x.x - origin.x, unit_x.y - origin.y),
+                          (unit_y.x - origin.x, unit_y.y - origin.y))
+    spans = np.column_stack((origin.x + xx * run_starts + xy * rows,
+                             origin.y + yx * run_starts + yy * rows,
+                             origin.x + xx * run_ends + xy * rows,
+                             origin.y + yx * run_ends + yy * rows))
+    for span in spans.tolist():
+        yield Span(*span)
+
+def thick_line(start, end, thickness):
+    """
+    Returns a generator that gives one horizontal 'Span()' per row covering
+    the pixels whose centres are within `thickness` / 2 of the line from
+    `start` to `end` (up to it on one side and less on the other, so a
+    `thickness` of n covers n pixels across an axis aligned line), measured
+    perpendicular to it, and not past its ends (butt caps; a square for a
+    single point). Every row intersects the two slabs (along and across the
+    line) the stroke is made of, so the cost grows with the rows covered
+    rather than with `thickness` times the length.
+    For a `thickness` of 1 or less it gives the spans of `bresanham_spans()`.
+    """
+    if thickness <= 1:
+        yield from bresanham_spans(start, end)
+        return
+    xdiff, ydiff = end.x - start.x, end.y - start.y
+    length = math.hypot(xdiff, ydiff)
+    half = thickness / 2
+    # Slabs as (unit normal, lowest and highest offset along it)
+    if length:
+        along_x, along_y = xdiff / length, ydiff / length
+        slabs = ((along_x, along_y, 0, length),
+                 (-along_y, along_x, -half, half - 1e-6))
+    else:
+        along_x, along_y = 1, 0
+        slabs = ((1, 0, -half, half - 1e-6), (0, 1, -half, half - 1e-6))
+    reach = half * abs(along_x)
+    for y in range(math.ceil(min(0, ydiff) - reach),
+                   math.floor(max(0, ydiff) + reach) + 1):
+        x_min, x_max = -math.inf, math.inf
+        for normal_x, normal_y, low, high in slabs:
+            offset = y * normal_y
+            if abs(normal_x) < 1e-12:
+                if not low - 1e-9 <= offset <= high + 1e-9:
+                    x_min = math.inf
+                continue
+            first = (low - offset) / normal_x
+            last = (high - offset) / normal_x
+            if normal_x < 0:
+                first, last = last, first
+            x_min, x_max = max(x_min, first), min(x_max, last)
+        if x_min <= x_max:
+            x0, x1 = math.ceil(x_min - 1e-9), math.floor(x_max + 1e-9)
+            if x0 <= x1:
+                yield Span(start.x + x0, start.y + y, start.x + x1, start.y + y)
+
+def bresanham_many(starts, ends, clip=None, pattern=None):
+    """
+    Rasterizes many lines at once using Bresenham's algorithm.
+    `starts` and `ends` are (N, 2) integer arrays of (x, y) end points.
+    The pixels of each line are exactly those given (in the same order) by
+    `bresanham()` for that line, with the same `clip` and `pattern` (a
+    'Stipple()' applied as a boolean mask over the steps).
+    Return:
+        (xs, ys, offsets) where `xs` and `ys` are flat int32 arrays of the
+        pixels of all lines and line `i` is made up of the pixels from
+        `offsets[i]` up to (not including) `offsets[i + 1]`
+    """
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.int64).reshape(-1, 2)
+    xdiff = ends[:, 0] - starts[:, 0]
+    ydiff = ends[:, 1] - starts[:, 1]
+
+    # Fold every line into the first quadrant with slope <= 1 like
+    # `bresanham()` does, but with per line flags instead of lambdas
+    steep = np.abs(ydiff) > np.abs(xdiff)
+    major = np.where(steep, np.abs(ydiff), np.abs(xdiff))
+    minor = np.where(steep, np.abs(xdiff), np.abs(ydiff))
+    sign_x = np.where(xdiff < 0, -1, 1)
+    sign_y = np.where(ydiff < 0, -1, 1)
+
+    # `bresanham_quad0()` gives the start point followed by a point for every
+    # step along the major axis from `first` to `last` (both inclusive)
+    first = np.zeros_like(major)
+    last = major
+    with_start = np.ones(len(major), dtype=np.int64)
+    if clip is not None:
+        # Fold the clip rectangle like the lines (see `quad0_steps()`)
+        x_lo = sign_x * (clip.x_min - starts[:, 0])
+        x_hi = sign_x * (clip.x_max - starts[:, 0])
+        y_lo = sign_y * (clip.y_min - starts[:, 1])
+        y_hi = sign_y * (clip.y_max - starts[:, 1])
+        u_min = np.where(steep, np.minimum(y_lo, y_hi), np.minimum(x_lo, x_hi))
+        u_max = np.where(steep, np.maximum(y_lo, y_hi), np.maximum(x_lo, x_hi))
+        v_min = np.where(steep, np.minimum(x_lo, x_hi), np.minimum(y_lo, y_hi))
+        v_max = np.where(steep, np.maximum(x_lo, x_hi), np.maximum(y_lo, y_hi))
+        minor_2 = 2 * np.maximum(minor, 1)
+        first_v = np.where(v_min <= 0, 0,
+                           np.where(minor > 0,
+                                    (major * (2 * v_min - 1)) // minor_2,
+                                    major + 1))
+        last_v = np.where(v_max < 0, -1,
+                          np.where(minor > 0,
+                                   (major * (2 * v_max + 1)) // minor_2 - 1,
+                                   major))
+        first = np.maximum(np.maximum(first_v, u_min), 0)
+        last = np.minimum(np.minimum(last_v, u_max), major)
+        with_start = ((u_min <= 0) & (u_max >= 0) &
+                      (v_min <= 0) & (v_max >= 0)).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0) + with_start
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    line = np.repeat(np.arange(len(counts)), counts)
+    # Index along the major axis, with the start point at index -1
+    index = np.arange(offsets[-1]) - offsets[:-1][line] - with_start[line]
+    step = np.where(index < 0, -1, first[line] + index)
+
+    # Closed form of the error parameter decisions in `bresanham_quad0()`:
+    # the minor coordinate at step `i` is
+    #     ceil((2 * minor * (i + 1) - major) / (2 * major))
+    # which is 0 for the start point (and for single pixel lines)
+    major_2 = 2 * np.maximum(major, 1)[line]
+    u = np.maximum(step, 0)
+    v = -((major[line] - 2 * minor[line] * (step + 1)) // major_2)
+
+    # Undo the folding and shift to the start point
+    line_steep = steep[line]
+    xs = starts[line, 0] + sign_x[line] * np.where(line_steep, v, u)
+    ys = starts[line, 1] + sign_y[line] * np.where(line_steep, u, v)
+    if pattern is not None:
+        on = stippling.step_mask(pattern, u)
+        xs, ys = xs[on], ys[on]
+        np.cumsum(np.bincount(line[on], minlength=len(counts)),
+                  out=offsets[1:])
+    return xs.astype(np.int32), ys.astype(np.int32), offsets
+
+def wu_line(start, end):
+    """
+    Returns the pixels of an anti-aliased line from `start` to `end` using
+    Xiaolin Wu's algorithm, for all of them at once as (xs, ys, coverage)
+    arrays: every step along the major axis covers the two pixels
+    straddling the ideal line, each by how close it is to it. The end points
+    are pixel centers and so fully covered.
+    """
+    steep = abs(end.y - start.y) > abs(end.x - start.x)
+    # Major and minor axis coordinates of the end points, left to right
+    (u0, v0), (u1, v1) = sorted(((start.y, start.x), (end.y, end.x)) if steep
+                                else ((start.x, start.y), (end.x, end.y)))
+    gradient = (v1 - v0) / (u1 - u0) if u1 != u0 else 0.0
+    us = np.arange(u0, u1 + 1)
+    vs = v0 + gradient * (us - u0)
+    below = np.floor(vs)
+    fraction = vs - below
+    us = np.concatenate((us, us))
+    vs = np.concatenate((below, below + 1)).astype(np.int64)
+    coverage = np.concatenate((1 - fraction, fraction)).astype(np.float32)
+    covered = coverage > 0
+    xs, ys = (vs, us) if steep else (us, vs)
+    return (xs[covered].astype(np.int32), ys[covered].astype(np.int32),
+            coverage[covered])
+
+def bresanham_buffer(start, end, buffer=None, clip=None, pattern=None):
+    """
+    Fills the pixels of `bresanham()` (in the same order) into a
+    'PointBuffer()', a new one unless `buffer` is given, and returns it
+    """
+    if buffer is None:
+        buffer = PointBuffer()
+    xs, ys, _ = bresanham_many([start], [end], clip, pattern)
+    buffer.extend(xs, ys)
+    return buffer
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -151,19 +467,77 @@ if __name__ == '__main__':
                         type=int,
                         default=500,
                         help="Window size in pixels (equal width an height)")
+    parser.add_argument("--animate", "-a",
+                        action="store_true",
+                        help="Plot a pixel at a time, updating the display "
+                             "after each")
+    parser.add_argument("--headless",
+                        action="store_true",
+                        help="Rasterize in memory at full speed without a "
+                             "window, print the time taken and exit")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the rasterized image to this PNG file")
+    parser.add_argument("--spans", "-s",
+                        action="store_true",
+                        help="Plot a run of pixels at a time")
+    parser.add_argument("--pattern", "-p",
+                        type=stippling.parse,
+                        default=None,
+                        help="Dash pattern as a 16 bit mask (e.g. 0x00ff), "
+                             "bit 0 first")
+    parser.add_argument("--factor", "-f",
+                        type=int,
+                        default=1,
+                        help="Pixels per bit of the dash pattern")
+    parser.add_argument("--antialias",
+                        action="store_true",
+                        help="Plot an anti-aliased line (Xiaolin Wu's "
+                             "algorithm)")
+    parser.add_argument("--thickness", "-t",
+                        type=float,
+                        default=1,
+                        help="Pen width in pixels, a row of pixels at a time "
+                             "when above 1")
     args = parser.parse_args()
 
     # Init display
-    pygame.display.init()
-    screen = pygame.display.set_mode((args.window_size, args.window_size))
-    surface = pygame.display.get_surface()
+    if args.headless:
+        target = framebuffer.Framebuffer(args.window_size, args.window_size)
+    else:
+        pygame.display.init()
+        screen = pygame.display.set_mode((args.window_size,
+                                          args.window_size))
+        surface = pygame.display.get_surface()
+        target = framebuffer.make_target(surface, args.animate)
+    start_time = time.perf_counter()
+    window = clipping.window_rect(target.width, target.height)
 
     # Plot generated points
-    for point in bresanham(Point(args.X_START, args.Y_START),
-                           Point(args.X_END, args.Y_END)):
-        plot(point)
-        time.sleep(0.005)
-        pygame.display.update()
+    start = Point(args.X_START, args.Y_START)
+    end = Point(args.X_END, args.Y_END)
+    pattern = args.pattern
+    if pattern is not None:
+        pattern = pattern._replace(factor=args.factor)
+    if args.antialias:
+        target.blend_points(*wu_line(start, end))
+    elif args.thickness > 1:
+        target.plot_spans(thick_line(start, end, args.thickness))
+    elif args.spans and pattern is None:
+        target.plot_spans(bresanham_spans(start, end, window))
+    elif args.animate:
+        target.plot_many(bresanham(start, end, window, pattern))
+    else:
+        xs, ys, _ = bresanham_many([start], [end], window, pattern)
+        target.plot_points(xs, ys)
+    target.present()
+    elapsed = time.perf_counter() - start_time
+
+    if args.output:
+        target.save(args.output)
+    if args.headless:
+        print("Rasterized in {:.6f}s".format(elapsed))
+        sys.exit()
 
     # Wait till window quit
     running = True
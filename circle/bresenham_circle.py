@@ -7,9 +7,37 @@ import argparse
 import math
 from collections import namedtuple
 import time
+import numpy as np
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import arcs
+from raster import framebuffer
+from raster.points import PointBuffer
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y'])
+# An axis aligned run of pixels from (x0, y0) to (x1, y1), both inclusive
+Span = namedtuple('Span', ['x0', 'y0', 'x1', 'y1'])
+
+# How the point (x, y) of the first octant of `circle()` (from (0, radius) to
+# the diagonal) maps into each octant k, the one covering the angles from
+# k * 45 to (k + 1) * 45 degrees, as (swap x and y, sign of x, sign of y, angle
+# offset, angle direction) so that the angle of the mapped point is
+# offset + direction * (angle of (x, y))
+OCTANTS = (
+    (True, 1, 1, math.pi / 2, -1),
+    (False, 1, 1, 0, 1),
+    (False, -1, 1, math.pi, -1),
+    (True, -1, 1, math.pi / 2, 1),
+    (True, -1, -1, 3 * math.pi / 2, -1),
+    (False, -1, -1, math.pi, 1),
+    (False, 1, -1, 2 * math.pi, -1),
+    (True, 1, -1, 3 * math.pi / 2, 1),
+)
 
 def sign(number):
     """
@@ -21,13 +49,6 @@ def sign(number):
     return int(math.copysign(1, number))
 
 
-def plot(point, color=(255, 255, 255)):
-    """
-    Plot a colored pixel at (`x`, `y`)
-    `color` is specified as (R, G, B) with each value ranging till 255
-    """
-    surface.set_at((point.x, point.y), color)
-
 def irange(start, end, abs_delta=1):
     """
     Returns an inclusive range() generator in steps of `abs_delta`
@@ -57,9 +78,232 @@ def circle(radius):
             y -= 1
         x += 1
 
+def filled_circle(radius):
+    """
+    Returns a generator that gives the horizontal 'Span()'s filling a circle of
+    radius `radius` centered at the origin, one per row, from the decision
+    state of `circle()`: every step gives the rows +-x (as wide as y) and the
+    last step before y changes gives the rows +-y (as wide as x)
+    """
+    x, y = 0, radius
+    diff = 3 - 2 * radius
+    while x <= y:
+        # On the diagonal the rows +-x are the rows +-y given below
+        if x < y:
+            yield Span(-y, x, y, x)
+            if x:
+                yield Span(-y, -x, y, -x)
+        diff += 4 * x + 6
+        if diff > 0 or x + 1 > y:
+            yield Span(-x, y, x, y)
+            if y:
+                yield Span(-x, -y, x, -y)
+        if diff > 0:
+            diff += -(4 *  y) + 4
+            y -= 1
+        x += 1
+
+def disc_rows(radius):
+    """
+    Returns a dict of the half widths of the rows of `filled_circle()` by row
+    (empty for a negative `radius`)
+    """
+    if radius < 0:
+        return {}
+    return {span.y0: span.x1 for span in filled_circle(radius)}
+
+def thick_circle(radius, thickness):
+    """
+    Returns a generator that gives the horizontal 'Span()'s of a ring of
+    `thickness` pixels centered at the origin, row by row from the top: the
+    annulus between the midpoint discs of radius
+    `radius` + `thickness` // 2 and `thickness` less, with one span per row
+    where it is solid and two where it goes around the hole.
+    For a `thickness` of 1 or less it gives the points of `circle_numpy()` as
+    single pixel spans.
+    """
+    if thickness <= 1:
+        for x, y in zip(*circle_numpy(radius)):
+            yield Span(int(x), int(y), int(x), int(y))
+        return
+    outer = radius + thickness // 2
+    outer_rows = disc_rows(outer)
+    hole_rows = disc_rows(outer - thickness)
+    for y in range(-outer, outer + 1):
+        x_outer = outer_rows[y]
+        x_hole = hole_rows.get(y)
+        if x_hole is None:
+            yield Span(-x_outer, y, x_outer, y)
+        elif x_hole < x_outer:
+            yield Span(-x_outer, y, -x_hole - 1, y)
+            yield Span(x_hole + 1, y, x_outer, y)
+
+def circle_buffer(radius, buffer=None):
+    """
+    Fills the points of `circle_numpy()` (in the same order) into a
+    'PointBuffer()', a new one unless `buffer` is given, and returns it
+    """
+    if buffer is None:
+        buffer = PointBuffer()
+    buffer.extend(*circle_numpy(radius))
+    return buffer
+
+def isqrt(values):
+    """
+    Returns floor(sqrt(`values`)) of an int64 array, exactly
+    """
+    roots = np.floor(np.sqrt(values)).astype(np.int64)
+    # Correct the (at most one off) rounding of the float square root
+    roots -= roots * roots > values
+    roots += (roots + 1) * (roots + 1) <= values
+    return roots
+
+def circle_numpy(radius):
+    """
+    Returns the points of `circle()` all at once, without the duplicates it
+    gives on the axes (x == 0) and the diagonals (x == y), as contiguous
+    (xs, ys) int32 arrays.
+    The first octant (from (0, radius) to the diagonal) comes from the closed
+    form of the decisions of `circle()`: the row of step x > 0 is the largest
+    y with
+        2 * (x + 1)**2 + y**2 + (y - 1)**2 <= 2 * radius**2
+    except that y only drops by one per step (which matters for tiny radii),
+    i.e. x + y is the running maximum of x + that y. It is then mirrored to
+    the other octants by broadcasting.
+    The points are ordered octant by octant in the order `circle()` gives them
+    within a step,
+        (x, y), (x, -y), (-x, y), (-x, -y), (y, x), (y, -x), (-y, x), (-y, -x)
+    each octant going from the axis towards the diagonal.
+    """
+    # First octant, x <= y holds for x up to radius / sqrt(2)
+    x = np.arange(int(radius / math.sqrt(2)) + 2, dtype=np.int64)
+    y = (1 + isqrt(np.maximum(
+        4 * radius * radius - 4 * (x + 1) * (x + 1) - 1, 0))) // 2
+    y[0] = radius
+    y = np.maximum.accumulate(x + y) - x
+    octant = x <= y
+    x, y = x[octant], y[octant]
+
+    # Mirror to all eight octants, one row per octant
+    signs = np.array([[1, 1], [1, -1], [-1, 1], [-1, -1]] * 2)
+    swapped = np.array([False] * 4 + [True] * 4)
+    xs = signs[:, :1] * np.where(swapped[:, None], y, x)
+    ys = signs[:, 1:] * np.where(swapped[:, None], x, y)
+
+    # Drop the octants that repeat an earlier one: on the axis the -x
+    # octants (and their swaps), on the diagonal the swapped octants, and the
+    # -y octants of a zero radius circle
+    unique = np.ones(xs.shape, dtype=bool)
+    unique[[2, 3, 5, 7]] &= x != 0
+    unique[[1, 3]] &= y != 0
+    unique[4:] &= x != y
+    return (np.ascontiguousarray(xs[unique], dtype=np.int32),
+            np.ascontiguousarray(ys[unique], dtype=np.int32))
+
+def octant_rows(radius, x):
+    """
+    Returns the y `circle()` is at in step `x` of the first octant, directly:
+    the largest y with
+        2 * (x + 1)**2 + y**2 + (y - 1)**2 <= 2 * radius**2
+    except that y only drops by one per step, which matters on the diagonal
+    """
+    row = lambda x: (1 + math.isqrt(max(
+        4 * radius * radius - 4 * (x + 1) * (x + 1) - 1, 0))) // 2
+    if x == 0:
+        return radius
+    return max(row(x), row(x - 1) - 1)
+
+def octant_range(radius, low, high):
+    """
+    Returns a generator that gives the points (x, y) of the first octant of
+    `circle()` with angles from `low` to `high` (in radians, None for no
+    bound), in the same order, starting the midpoint state machine right at
+    the first of them
+    """
+    if high is None:
+        x = 0
+    else:
+        # Points are within a pixel of the circle, so they can not come
+        # before this step
+        x = max(int(radius * math.cos(high)) - 2, 0)
+    y = octant_rows(radius, x)
+    diff = 2 * (x + 1)**2 + y**2 + (y - 1)**2 - 2 * radius**2
+    while x <= y:
+        if low is not None and y * math.cos(low) - x * math.sin(low) < 0:
+            return
+        if high is None or y * math.cos(high) - x * math.sin(high) <= 0:
+            yield Point(x, y)
+        diff += 4 * x + 6
+        if diff > 0:
+            diff += -(4 *  y) + 4
+            y -= 1
+        x += 1
+
+def arc(radius, start_angle, end_angle):
+    """
+    Returns a generator that gives the points of `circle()` (without
+    duplicates) with angles from `start_angle` to `end_angle` (in radians,
+    towards increasing angles, i.e. from the X axis towards the Y axis), in
+    order along the arc. Only the steps of the octants the arc passes
+    through, from the first point of the arc in them, are computed.
+    """
+    first = previous = None
+    for octant, low, high in arcs.sector_pieces(start_angle, end_angle, 8):
+        swap, sign_x, sign_y, offset, direction = OCTANTS[octant]
+        # Bounds of the angle in the first octant
+        if direction > 0:
+            low, high = (None if low is None else low - offset,
+                         None if high is None else high - offset)
+        else:
+            low, high = (None if high is None else offset - high,
+                         None if low is None else offset - low)
+        points = [Point(sign_x * y, sign_y * x) if swap else
+                  Point(sign_x * x, sign_y * y)
+                  for x, y in octant_range(radius, low, high)]
+        # Angles fall along the first octant, and so along the octant if it
+        # has the same direction
+        if direction > 0:
+            points.reverse()
+        for point in points:
+            # Octants share the points on their boundaries
+            if point != previous and point != first:
+                yield point
+                previous = point
+                first = first or point
+
+def wu_circle(radius):
+    """
+    Returns the pixels of an anti-aliased circle of radius `radius` centered
+    at the origin using Xiaolin Wu's algorithm, for all of them at once as
+    (xs, ys, coverage) arrays: every column of the first octant covers the
+    two pixels straddling the ideal circle, each by how close it is to it,
+    mirrored to all eight octants by broadcasting (the octants overlap at
+    their ends, blend with the largest coverage)
+    """
+    x = np.arange(int(radius / math.sqrt(2)) + 1, dtype=np.int64)
+    y = np.sqrt(radius * radius - x * x)
+    below = np.floor(y)
+    fraction = (y - below).astype(np.float32)
+    x = np.concatenate((x, x))
+    y = np.concatenate((below, below + 1)).astype(np.int64)
+    coverage = np.concatenate((1 - fraction, fraction))
+    covered = coverage > 0
+    x, y, coverage = x[covered], y[covered], coverage[covered]
+
+    signs = np.array([[1, 1], [1, -1], [-1, 1], [-1, -1]] * 2)
+    swapped = np.array([False] * 4 + [True] * 4)
+    xs = signs[:, :1] * np.where(swapped[:, None], y, x)
+    ys = signs[:, 1:] * np.where(swapped[:, None], x, y)
+    return (xs.ravel().astype(np.int32), ys.ravel().astype(np.int32),
+            np.tile(coverage, 8))
+
 def translate(shift_x, shift_y, point):
     return Point(shift_x + point.x, shift_y + point.y)
 
+def translate_span(shift_x, shift_y, span):
+    return Span(shift_x + span.x0, shift_y + span.y0,
+                shift_x + span.x1, shift_y + span.y1)
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -77,19 +321,79 @@ if __name__ == '__main__':
                         type=int,
                         default=500,
                         help="Window size in pixels (equal width an height)")
+    parser.add_argument("--animate", "-a",
+                        action="store_true",
+                        help="Plot a pixel at a time, updating the display "
+                             "after each")
+    parser.add_argument("--arc",
+                        type=float,
+                        nargs=2,
+                        metavar=("START", "END"),
+                        default=None,
+                        help="Only plot the arc from START to END degrees "
+                             "(clockwise on the screen)")
+    parser.add_argument("--antialias",
+                        action="store_true",
+                        help="Plot an anti-aliased circle (Xiaolin Wu's "
+                             "algorithm)")
+    parser.add_argument("--thickness", "-t",
+                        type=int,
+                        default=1,
+                        help="Pen width in pixels, a row of pixels at a time "
+                             "when above 1")
+    parser.add_argument("--fill", "-f",
+                        action="store_true",
+                        help="Fill the inside a row of pixels at a time")
+    parser.add_argument("--headless",
+                        action="store_true",
+                        help="Rasterize in memory at full speed without a "
+                             "window, print the time taken and exit")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the rasterized image to this PNG file")
     args = parser.parse_args()
 
     # Init display
-    pygame.display.init()
-    screen = pygame.display.set_mode((args.window_size, args.window_size))
-    surface = pygame.display.get_surface()
+    if args.headless:
+        target = framebuffer.Framebuffer(args.window_size, args.window_size)
+    else:
+        pygame.display.init()
+        screen = pygame.display.set_mode((args.window_size,
+                                          args.window_size))
+        surface = pygame.display.get_surface()
+        target = framebuffer.make_target(surface, args.animate)
+    start_time = time.perf_counter()
 
     # Plot generated points
-    for point in (translate(args.CENTER_X, args.CENTER_Y, point)
-                  for point in circle(args.RADIUS)):
-        plot(point)
-        time.sleep(0.005)
-        pygame.display.update()
+    if args.fill:
+        target.plot_spans(translate_span(args.CENTER_X, args.CENTER_Y, span)
+                          for span in filled_circle(args.RADIUS))
+    elif args.antialias:
+        xs, ys, coverage = wu_circle(args.RADIUS)
+        target.blend_points(xs + args.CENTER_X, ys + args.CENTER_Y, coverage)
+    elif args.thickness > 1:
+        target.plot_spans(translate_span(args.CENTER_X, args.CENTER_Y, span)
+                          for span in thick_circle(args.RADIUS,
+                                                   args.thickness))
+    elif args.arc:
+        start_angle, end_angle = map(math.radians, args.arc)
+        target.plot_many(translate(args.CENTER_X, args.CENTER_Y, point)
+                         for point in arc(args.RADIUS,
+                                          start_angle, end_angle))
+    elif args.animate:
+        target.plot_many(translate(args.CENTER_X, args.CENTER_Y, point)
+                         for point in circle(args.RADIUS))
+    else:
+        xs, ys = circle_numpy(args.RADIUS)
+        target.plot_points(xs + args.CENTER_X, ys + args.CENTER_Y)
+    target.present()
+    elapsed = time.perf_counter() - start_time
+
+    if args.output:
+        target.save(args.output)
+    if args.headless:
+        print("Rasterized in {:.6f}s".format(elapsed))
+        sys.exit()
 
     # Wait till window quit
     while pygame.event.wait().type != pygame.QUIT:
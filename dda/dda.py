@@ -1,15 +1,30 @@
 #!/usr/bin/env python3
 """
-Plots a line using DDA algorithm (integer arithmetic only)
+Plots a line using DDA algorithm, stepping along it in floating point or in
+exact integer arithmetic, with every pixel rounded halves up
 """
 import pygame
 import argparse
 import math
 from collections import namedtuple
 import time
+import timeit
+import numpy as np
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import framebuffer
+from raster.points import PointBuffer
+from raster import clip as clipping
+from raster import stipple as stippling
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y'])
+# An axis aligned run of pixels from (x0, y0) to (x1, y1), both inclusive
+Span = namedtuple('Span', ['x0', 'y0', 'x1', 'y1'])
 
 def sign(number):
     """
@@ -21,13 +36,6 @@ def sign(number):
     return int(math.copysign(1, number))
 
 
-def plot(point, color=(255, 255, 255)):
-    """
-    Plot a colored pixel at (`x`, `y`)
-    `color` is specified as (R, G, B) with each value ranging till 255
-    """
-    surface.set_at((point.x, point.y), color)
-
 def irange(start, end, abs_delta=1):
     """
     Returns an inclusive range() generator in steps of `abs_delta`
@@ -39,7 +47,9 @@ def irange(start, end, abs_delta=1):
 def dda(start, end):
     """
     Returns a generator that gives the line pixel coordinates using DDA
-    algorithm
+    algorithm, rounding halves up like `dda_fixed()` (and not to even like
+    `round()`), so both give the same pixels unless the float accumulator
+    drifts across a half
     """
     ydiff = end.y - start.y
     xdiff = end.x - start.x
@@ -52,13 +62,211 @@ def dda(start, end):
         if abs(slope) <= 1:
             y = start.y
             for x in irange(start.x, end.x):
-                yield Point(x, int(round(y)))
-                y += slope * sign(end.y - start.y)
+                yield Point(x, math.floor(y + 0.5))
+                y += slope * sign(end.x - start.x)
         else:
             x = start.x
             for y in irange(start.y, end.y):
-                yield Point(int(round(x)), y)
-                x += (1 / slope) * sign(end.x - start.x)
+                yield Point(math.floor(x + 0.5), y)
+                x += (1 / slope) * sign(end.y - start.y)
+
+
+def minor_offset(delta, steps, step):
+    """
+    Returns the offset along the minor axis at `step` (an int or an array) of
+    a line moving `delta` along it over `steps` steps along the major axis,
+    delta * step / steps exactly rounded halves up:
+        (2 * delta * step + steps) // (2 * steps)
+    """
+    steps = max(steps, 1)
+    return (2 * delta * step + steps) // (2 * steps)
+
+
+def minor_offsets(delta, steps, first):
+    """
+    Returns a generator that gives `minor_offset()` for the steps from
+    `first` on, keeping the exact quotient and remainder of the division
+    and adding their increments per step, so there is no division or drift
+    """
+    steps = max(steps, 1)
+    denominator = 2 * steps
+    offset, remainder = divmod(2 * delta * first + steps, denominator)
+    step_offset, step_remainder = divmod(2 * delta, denominator)
+    while True:
+        yield offset
+        offset += step_offset
+        remainder += step_remainder
+        if remainder >= denominator:
+            offset += 1
+            remainder -= denominator
+
+
+def clip_steps(major, major_sign, minor, delta, steps, clip_major,
+               clip_minor):
+    """
+    Returns the (first, last) of the steps 0 to `steps` of a DDA line whose
+    pixels are inside the clip bounds, where step i is at
+    `major` + i * `major_sign` along the major axis and at
+    `minor` + `minor_offset(delta, steps, i)` along the minor axis.
+    `clip_major` and `clip_minor` are the (min, max) bounds of each axis.
+    first > last if no step is inside
+    """
+    if major_sign > 0:
+        first, last = clip_major[0] - major, clip_major[1] - major
+    else:
+        first, last = major - clip_major[1], major - clip_major[0]
+    # The offset is inside [low, high] when low <= (2 * delta * i + n) //
+    # (2 * n) <= high, that is when 2 * delta * i is inside [lowest, highest]
+    n = max(steps, 1)
+    lowest = 2 * n * (clip_minor[0] - minor) - n
+    highest = 2 * n * (clip_minor[1] - minor + 1) - n - 1
+    if delta > 0:
+        first = max(first, -(-lowest // (2 * delta)))
+        last = min(last, highest // (2 * delta))
+    elif delta < 0:
+        first = max(first, -(highest // (-2 * delta)))
+        last = min(last, -lowest // (-2 * delta))
+    elif not lowest <= 0 <= highest:
+        return 0, -1
+    return max(first, 0), min(last, steps)
+
+
+def step_runs(first, last, pattern=None):
+    """
+    Returns the (first, last) runs of the steps from `first` to `last` to
+    plot, all of them unless `pattern` is a 'Stipple()'
+    """
+    if pattern is None:
+        return [(first, last)]
+    return stippling.on_runs(pattern, first, last)
+
+
+def dda_fixed(start, end, clip=None, pattern=None):
+    """
+    Returns a generator that gives the line pixel coordinates using DDA
+    algorithm in integer arithmetic.
+    The minor axis coordinate is kept as the exact quotient and remainder of
+    its offset over twice the number of steps (see `minor_offsets()`), so it
+    does not drift like the float accumulator of `dda()` and every pixel is
+    the ideal line rounded halves up, however long the line.
+    If `clip` is a 'ClipRect()' only the pixels inside it are given, starting
+    the accumulator at the first visible step instead of walking up to it.
+    If `pattern` is a 'Stipple()' only the steps that are on in it are given,
+    restarting the accumulator at every run of them.
+    """
+    ydiff = end.y - start.y
+    xdiff = end.x - start.x
+
+    if abs(ydiff) <= abs(xdiff):
+        first, last = 0, abs(xdiff)
+        if clip is not None:
+            first, last = clip_steps(start.x, sign(xdiff), start.y, ydiff,
+                                     last, (clip.x_min, clip.x_max),
+                                     (clip.y_min, clip.y_max))
+        x_sign = sign(xdiff)
+        for run_first, run_last in step_runs(first, last, pattern):
+            for x, offset in zip(range(start.x + x_sign * run_first,
+                                       start.x + x_sign * (run_last + 1),
+                                       x_sign),
+                                 minor_offsets(ydiff, abs(xdiff), run_first)):
+                yield Point(x, start.y + offset)
+    else:
+        first, last = 0, abs(ydiff)
+        if clip is not None:
+            first, last = clip_steps(start.y, sign(ydiff), start.x, xdiff,
+                                     last, (clip.y_min, clip.y_max),
+                                     (clip.x_min, clip.x_max))
+        y_sign = sign(ydiff)
+        for run_first, run_last in step_runs(first, last, pattern):
+            for y, offset in zip(range(start.y + y_sign * run_first,
+                                       start.y + y_sign * (run_last + 1),
+                                       y_sign),
+                                 minor_offsets(xdiff, abs(ydiff), run_first)):
+                yield Point(start.x + offset, y)
+
+
+def dda_numpy(start, end, clip=None, pattern=None):
+    """
+    Returns the pixels of `dda_fixed()` all at once as (xs, ys) int32 arrays,
+    computing the minor axis coordinates from a NumPy arange with a single
+    integer multiply and floor division (see `minor_offset()`)
+    If `clip` is a 'ClipRect()' only the pixels inside it are computed.
+    If `pattern` is a 'Stipple()' only the steps that are on in it are kept,
+    selected by a boolean mask over the steps.
+    """
+    ydiff = end.y - start.y
+    xdiff = end.x - start.x
+
+    if abs(ydiff) <= abs(xdiff):
+        first, last = 0, abs(xdiff)
+        if clip is not None:
+            first, last = clip_steps(start.x, sign(xdiff), start.y, ydiff,
+                                     last, (clip.x_min, clip.x_max),
+                                     (clip.y_min, clip.y_max))
+        steps = np.arange(first, last + 1, dtype=np.int64)
+        if pattern is not None:
+            steps = steps[stippling.step_mask(pattern, steps)]
+        xs = start.x + sign(xdiff) * steps
+        ys = start.y + minor_offset(ydiff, abs(xdiff), steps)
+    else:
+        first, last = 0, abs(ydiff)
+        if clip is not None:
+            first, last = clip_steps(start.y, sign(ydiff), start.x, xdiff,
+                                     last, (clip.y_min, clip.y_max),
+                                     (clip.x_min, clip.x_max))
+        steps = np.arange(first, last + 1, dtype=np.int64)
+        if pattern is not None:
+            steps = steps[stippling.step_mask(pattern, steps)]
+        xs = start.x + minor_offset(xdiff, abs(ydiff), steps)
+        ys = start.y + sign(ydiff) * steps
+    return xs.astype(np.int32), ys.astype(np.int32)
+
+
+def dda_buffer(start, end, buffer=None, clip=None, pattern=None):
+    """
+    Fills the pixels of `dda_fixed()` (in the same order) into a
+    'PointBuffer()', a new one unless `buffer` is given, and returns it
+    """
+    if buffer is None:
+        buffer = PointBuffer()
+    buffer.extend(*dda_numpy(start, end, clip, pattern))
+    return buffer
+
+
+def benchmark(start, end, number=10):
+    """
+    Time `dda()`, `dda_fixed()` and `dda_numpy()` over the line from `start`
+    to `end`, `number` times each
+    Return:
+        dict of the mode name to the pixels per second
+    """
+    pixels = max(abs(end.x - start.x), abs(end.y - start.y)) + 1
+    modes = {
+        'float': lambda: list(dda(start, end)),
+        'fixed': lambda: list(dda_fixed(start, end)),
+        'numpy': lambda: dda_numpy(start, end),
+    }
+    return {name: pixels * number / timeit.timeit(mode, number=number)
+            for name, mode in modes.items()}
+
+
+def dda_spans(start, end, clip=None):
+    """
+    Returns a generator that gives the pixels of `dda_numpy()` as 'Span()'s,
+    runs of pixels along the major axis which share the same minor axis
+    coordinate, split where the minor coordinates of the pixels change.
+    If `clip` is a 'ClipRect()' only the pixels inside it are given.
+    """
+    xs, ys = dda_numpy(start, end, clip)
+    if not len(xs):
+        return
+    minor = ys if abs(end.y - start.y) <= abs(end.x - start.x) else xs
+    breaks = np.flatnonzero(np.diff(minor)) + 1
+    firsts = np.concatenate(([0], breaks)).tolist()
+    lasts = np.concatenate((breaks - 1, [len(xs) - 1])).tolist()
+    xs, ys = xs.tolist(), ys.tolist()
+    for first, last in zip(firsts, lasts):
+        yield Span(xs[first], ys[first], xs[last], ys[last])
 
 
 if __name__ == '__main__':
@@ -80,19 +288,82 @@ if __name__ == '__main__':
                         type=int,
                         default=500,
                         help="Window size in pixels (equal width an height)")
+    parser.add_argument("--animate", "-a",
+                        action="store_true",
+                        help="Plot a pixel at a time, updating the display "
+                             "after each")
+    parser.add_argument("--headless",
+                        action="store_true",
+                        help="Rasterize in memory at full speed without a "
+                             "window, print the time taken and exit")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the rasterized image to this PNG file")
+    parser.add_argument("--spans", "-s",
+                        action="store_true",
+                        help="Plot a run of pixels at a time")
+    parser.add_argument("--pattern", "-p",
+                        type=stippling.parse,
+                        default=None,
+                        help="Dash pattern as a 16 bit mask (e.g. 0x00ff), "
+                             "bit 0 first (fixed and numpy modes)")
+    parser.add_argument("--factor", "-f",
+                        type=int,
+                        default=1,
+                        help="Pixels per bit of the dash pattern")
+    parser.add_argument("--mode", "-m",
+                        choices=("float", "fixed", "numpy"),
+                        default="float",
+                        help="Arithmetic used to step along the line")
+    parser.add_argument("--benchmark", "-b",
+                        action="store_true",
+                        help="Print the pixels per second of every mode "
+                             "instead of plotting")
     args = parser.parse_args()
 
+    if args.spans and (args.pattern is not None or args.mode != "float"):
+        parser.error("--spans draws solid lines, one run at a time, and "
+                     "takes no --pattern or --mode")
+
+    start = Point(args.X_START, args.Y_START)
+    end = Point(args.X_END, args.Y_END)
+    pattern = args.pattern
+    if pattern is not None:
+        pattern = pattern._replace(factor=args.factor)
+    if args.benchmark:
+        for name, rate in benchmark(start, end).items():
+            print("{:>6}: {:14,.0f} pixels/s".format(name, rate))
+        sys.exit()
+
     # Init display
-    pygame.display.init()
-    screen = pygame.display.set_mode((args.window_size, args.window_size))
-    surface = pygame.display.get_surface()
+    if args.headless:
+        target = framebuffer.Framebuffer(args.window_size, args.window_size)
+    else:
+        pygame.display.init()
+        screen = pygame.display.set_mode((args.window_size,
+                                          args.window_size))
+        surface = pygame.display.get_surface()
+        target = framebuffer.make_target(surface, args.animate)
+    start_time = time.perf_counter()
+    window = clipping.window_rect(target.width, target.height)
 
     # Plot generated points
-    for point in dda(Point(args.X_START, args.Y_START),
-                     Point(args.X_END, args.Y_END)):
-        plot(point)
-        time.sleep(0.005)
-        pygame.display.update()
+    if args.spans:
+        target.plot_spans(dda_spans(start, end, window))
+    elif args.mode == "numpy":
+        target.plot_points(*dda_numpy(start, end, window, pattern))
+    elif args.mode == "fixed":
+        target.plot_many(dda_fixed(start, end, window, pattern))
+    else:
+        target.plot_many(dda(start, end))
+    target.present()
+    elapsed = time.perf_counter() - start_time
+
+    if args.output:
+        target.save(args.output)
+    if args.headless:
+        print("Rasterized in {:.6f}s".format(elapsed))
+        sys.exit()
 
     # Wait till window quit
     running = True
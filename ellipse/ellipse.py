@@ -7,9 +7,36 @@ import argparse
 import math
 from collections import namedtuple
 import time
+import numpy as np
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import arcs
+from raster import framebuffer
+from raster.points import PointBuffer
+
+# Number of steps the NumPy mode generates at a time
+CHUNK_SIZE = 1 << 16
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y'])
+# An axis aligned run of pixels from (x0, y0) to (x1, y1), both inclusive
+Span = namedtuple('Span', ['x0', 'y0', 'x1', 'y1'])
+
+# How the point (x, y) of the first quadrant of `ellipse()` (from
+# (0, radius_y) to (radius_x, 0)) maps into each quadrant k, the one covering
+# the angles from k * 90 to (k + 1) * 90 degrees, as (sign of x, sign of y,
+# angle offset, angle direction) so that the angle of the mapped point is
+# offset + direction * (angle of (x, y))
+QUADRANTS = (
+    (1, 1, 0, 1),
+    (-1, 1, math.pi, -1),
+    (-1, -1, math.pi, 1),
+    (1, -1, 2 * math.pi, -1),
+)
 
 def sign(number):
     """
@@ -21,13 +48,6 @@ def sign(number):
     return int(math.copysign(1, number))
 
 
-def plot(point, color=(255, 255, 255)):
-    """
-    Plot a colored pixel at (`x`, `y`)
-    `color` is specified as (R, G, B) with each value ranging till 255
-    """
-    surface.set_at((point.x, point.y), color)
-
 def irange(start, end, abs_delta=1):
     """
     Returns an inclusive range() generator in steps of `abs_delta`
@@ -74,9 +94,450 @@ def ellipse(radius_x, radius_y):
         yield Point(-x, y)
         yield Point(-x, -y)
 
+def ellipse_int(radius_x, radius_y):
+    """
+    Returns a generator that gives the same points as `ellipse()` with its
+    decision parameters multiplied by 4, so they stay exact Python ints
+    instead of floats that lose precision for large radii
+    """
+    rad_xsq = radius_x**2
+    rad_ysq = radius_y**2
+    x, y = 0, radius_y
+    diff_x, diff_y = 0, 2 * y * rad_xsq
+    diff = 4 * rad_ysq - 4 * rad_xsq * radius_y + rad_xsq
+
+    yield Point(x, y)
+
+    while diff_x < diff_y:
+        x += 1
+        diff_x += 2 * rad_ysq
+        if diff < 0:
+            diff += 4 * (rad_ysq + diff_x)
+        else:
+            y -= 1
+            diff_y -= 2 * rad_xsq
+            diff += 4 * (rad_ysq + diff_x - diff_y)
+        yield Point(x, y)
+        yield Point(x, -y)
+        yield Point(-x, y)
+        yield Point(-x, -y)
+
+    diff = (rad_ysq * (2 * x + 1)**2 + 4 * rad_xsq * (y - 1)**2 -
+            4 * rad_xsq * rad_ysq)
+    while y > 0:
+        y -= 1
+        diff_y -= 2 * rad_xsq
+        if diff > 0:
+            diff += 4 * (rad_xsq - diff_y)
+        else:
+            x += 1
+            diff_x += 2 * rad_ysq
+            diff += 4 * (rad_xsq - diff_y + diff_x)
+        yield Point(x, y)
+        yield Point(x, -y)
+        yield Point(-x, y)
+        yield Point(-x, -y)
+
+def region1_row(radius_x, radius_y, x):
+    """
+    Returns the largest y >= 0 whose region 1 midpoint (x, y - 1/2) is
+    inside the ellipse (see `region1_rows()`), or 0 if there is none
+    """
+    room = 4 * radius_y**2 * (radius_x**2 - x * x)
+    if room <= 0:
+        return 0
+    return (math.isqrt((room - 1) // radius_x**2) + 1) // 2
+
+def region2_column(radius_x, radius_y, y):
+    """
+    Returns the largest x >= -1 whose region 2 midpoint (x + 1/2, y) is
+    inside (or on) the ellipse (see `region2_columns()`)
+    """
+    room = 4 * radius_x**2 * (radius_y**2 - y * y)
+    if room < radius_y**2:
+        return -1
+    return (math.isqrt(room // radius_y**2) - 1) // 2
+
+def region1_y(radius_x, radius_y, x):
+    """
+    Returns the y `ellipse_int()` is at in column `x` of region 1, directly:
+    the row of `region1_row()`, except that y only drops by one per step
+    """
+    return max(radius_y - x if step == 0 else
+               region1_row(radius_x, radius_y, step) - (x - step)
+               for step in range(max(x - 2, 0), x + 1))
+
+def region1_end(radius_x, radius_y):
+    """
+    Returns the last column of region 1 of `ellipse_int()` (where
+    radius_y**2 * x < radius_x**2 * y stops holding)
+    """
+    ends = lambda x: (radius_y**2 * x >=
+                      radius_x**2 * region1_y(radius_x, radius_y, x))
+    if ends(0):
+        return 0
+    low, high = 0, 1
+    while not ends(high):
+        low, high = high, 2 * high
+    while high - low > 1:
+        middle = (low + high) // 2
+        if ends(middle):
+            high = middle
+        else:
+            low = middle
+    return high
+
+def region2_x(radius_x, radius_y, start, y):
+    """
+    Returns the x `ellipse_int()` is at in row `y` of region 2, directly,
+    given the 'Point()' `start` where region 1 ended: x moves towards the
+    column after `region2_column()`, gaining at most one per step
+    """
+    target = lambda step: max(
+        region2_column(radius_x, radius_y, start.y - step) + 1, start.x)
+    step = start.y - y
+    return min([start.x + step] +
+               [target(before) + step - before
+                for before in range(max(step - 2, 1), step + 1)])
+
+def ellipse_walk(radius_x, radius_y, x, y):
+    """
+    Returns a generator that gives the points (x, y) of the first quadrant of
+    `ellipse_int()` from its point (`x`, `y`) on, restarting the integer
+    midpoint state machine there
+    """
+    rad_xsq = radius_x**2
+    rad_ysq = radius_y**2
+    diff_x, diff_y = 2 * rad_ysq * x, 2 * rad_xsq * y
+    yield Point(x, y)
+
+    if diff_x < diff_y:
+        diff = (4 * rad_ysq * (x + 1)**2 + rad_xsq * (2 * y - 1)**2 -
+                4 * rad_xsq * rad_ysq)
+        while diff_x < diff_y:
+            x += 1
+            diff_x += 2 * rad_ysq
+            if diff < 0:
+                diff += 4 * (rad_ysq + diff_x)
+            else:
+                y -= 1
+                diff_y -= 2 * rad_xsq
+                diff += 4 * (rad_ysq + diff_x - diff_y)
+            yield Point(x, y)
+
+    diff = (rad_ysq * (2 * x + 1)**2 + 4 * rad_xsq * (y - 1)**2 -
+            4 * rad_xsq * rad_ysq)
+    while y > 0:
+        y -= 1
+        diff_y -= 2 * rad_xsq
+        if diff > 0:
+            diff += 4 * (rad_xsq - diff_y)
+        else:
+            x += 1
+            diff_x += 2 * rad_ysq
+            diff += 4 * (rad_xsq - diff_y + diff_x)
+        yield Point(x, y)
+
+def quadrant_range(radius_x, radius_y, low, high):
+    """
+    Returns a generator that gives the points (x, y) of the first quadrant of
+    `ellipse_int()` with angles from `low` to `high` (in radians, None for no
+    bound), in the same order, starting the midpoint state machine right at
+    the first of them, which is found by a binary search over the steps
+    """
+    end_x = region1_end(radius_x, radius_y)
+    end = Point(end_x, region1_y(radius_x, radius_y, end_x))
+
+    def point(step):
+        if step <= end.x:
+            return Point(step, region1_y(radius_x, radius_y, step))
+        y = end.y - (step - end.x)
+        return Point(region2_x(radius_x, radius_y, end, y), y)
+
+    # Angles fall along the quadrant, find the first step at or below `high`
+    first, last = 0, end.x + end.y + 1
+    if high is not None:
+        while first < last:
+            middle = (first + last) // 2
+            x, y = point(middle)
+            if y * math.cos(high) - x * math.sin(high) <= 0:
+                last = middle
+            else:
+                first = middle + 1
+        if first > end.x + end.y:
+            return
+    for x, y in ellipse_walk(radius_x, radius_y, *point(first)):
+        if low is not None and y * math.cos(low) - x * math.sin(low) < 0:
+            return
+        yield Point(x, y)
+
+def elliptical_arc(radius_x, radius_y, start_angle, end_angle):
+    """
+    Returns a generator that gives the points of `ellipse_int()` (without
+    duplicates, and with the point (0, -`radius_y`) it leaves out) with
+    angles from `start_angle` to `end_angle` (in radians, towards increasing
+    angles, i.e. from the X axis towards the Y axis), in order along the arc.
+    The angles are those of the pixels, not the parametric angles of the
+    ellipse. Only the steps of the quadrants the arc passes through, from
+    the first point of the arc in them, are computed.
+    """
+    first = None
+    on_axes = set()
+    for quadrant, low, high in arcs.sector_pieces(start_angle, end_angle, 4):
+        sign_x, sign_y, offset, direction = QUADRANTS[quadrant]
+        # Bounds of the angle in the first quadrant
+        if direction > 0:
+            low, high = (None if low is None else low - offset,
+                         None if high is None else high - offset)
+        else:
+            low, high = (None if high is None else offset - high,
+                         None if low is None else offset - low)
+        points = [Point(sign_x * x, sign_y * y)
+                  for x, y in quadrant_range(radius_x, radius_y, low, high)]
+        # Angles fall along the first quadrant, and so along the quadrant if
+        # it has the same direction
+        if direction > 0:
+            points.reverse()
+        for point in points:
+            # Quadrants share the points on the axes (all of them if a
+            # radius is 0), and a full turn ends where it started
+            if point.x == 0 or point.y == 0:
+                if point in on_axes:
+                    continue
+                on_axes.add(point)
+            if point != first:
+                yield point
+                first = first or point
+
+def row_spans(x, y):
+    """
+    Returns the 'Span()'s of the rows +-`y` from -`x` to `x`
+    """
+    if y:
+        return (Span(-x, y, x, y), Span(-x, -y, x, -y))
+    return (Span(-x, y, x, y),)
+
+def filled_ellipse(radius_x, radius_y):
+    """
+    Returns a generator that gives the horizontal 'Span()'s filling an ellipse
+    with radii `radius_x` and `radius_y` centered at the origin, one per row,
+    from the (exact integer) decision state of `ellipse_int()`: in region 1
+    the rows +-y are given once y is about to change (as wide as the last x),
+    in region 2 every step is a new row
+    """
+    rad_xsq = radius_x**2
+    rad_ysq = radius_y**2
+    x, y = 0, radius_y
+    diff_x, diff_y = 0, 2 * y * rad_xsq
+    # Decision parameters of `ellipse()` times 4, see `ellipse_int()`
+    diff = 4 * rad_ysq - 4 * rad_xsq * radius_y + rad_xsq
+
+    row_x, row_y = x, y
+    while diff_x < diff_y:
+        x += 1
+        diff_x += 2 * rad_ysq
+        if diff < 0:
+            diff += 4 * (rad_ysq + diff_x)
+        else:
+            y -= 1
+            diff_y -= 2 * rad_xsq
+            diff += 4 * (rad_ysq + diff_x - diff_y)
+        if y != row_y:
+            yield from row_spans(row_x, row_y)
+            row_y = y
+        row_x = x
+    yield from row_spans(row_x, row_y)
+
+    diff = (rad_ysq * (2 * x + 1)**2 + 4 * rad_xsq * (y - 1)**2 -
+            4 * rad_xsq * rad_ysq)
+    while y > 0:
+        y -= 1
+        diff_y -= 2 * rad_xsq
+        if diff > 0:
+            diff += 4 * (rad_xsq - diff_y)
+        else:
+            x += 1
+            diff_x += 2 * rad_ysq
+            diff += 4 * (rad_xsq - diff_y + diff_x)
+        yield from row_spans(x, y)
+
+def filled_rows(radius_x, radius_y):
+    """
+    Returns a dict of the half widths of the rows of `filled_ellipse()` by row
+    (empty if a radius is negative)
+    """
+    if radius_x < 0 or radius_y < 0:
+        return {}
+    return {span.y0: span.x1 for span in filled_ellipse(radius_x, radius_y)}
+
+def thick_ellipse(radius_x, radius_y, thickness):
+    """
+    Returns a generator that gives the horizontal 'Span()'s of an elliptical
+    ring of `thickness` pixels centered at the origin, row by row from the
+    top: the annulus between the midpoint ellipses with radii
+    `thickness` // 2 larger than `radius_x` and `radius_y` and `thickness`
+    less, with one span per row where it is solid and two where it goes
+    around the hole.
+    For a `thickness` of 1 or less it gives the points of `ellipse_numpy()` as
+    single pixel spans.
+    """
+    if thickness <= 1:
+        for x, y in zip(*ellipse_numpy(radius_x, radius_y)):
+            yield Span(int(x), int(y), int(x), int(y))
+        return
+    outer_x = radius_x + thickness // 2
+    outer_y = radius_y + thickness // 2
+    outer_rows = filled_rows(outer_x, outer_y)
+    hole_rows = filled_rows(outer_x - thickness, outer_y - thickness)
+    for y in range(-outer_y, outer_y + 1):
+        x_outer = outer_rows[y]
+        x_hole = hole_rows.get(y)
+        if x_hole is None:
+            yield Span(-x_outer, y, x_outer, y)
+        elif x_hole < x_outer:
+            yield Span(-x_outer, y, -x_hole - 1, y)
+            yield Span(x_hole + 1, y, x_outer, y)
+
+def ellipse_buffer(radius_x, radius_y, buffer=None):
+    """
+    Fills the points of `ellipse_int()` (in the same order) into a
+    'PointBuffer()', a new one unless `buffer` is given, a chunk of
+    `ellipse_chunks()` at a time, and returns it
+    """
+    if buffer is None:
+        buffer = PointBuffer()
+    for xs, ys in ellipse_chunks(radius_x, radius_y):
+        buffer.extend(xs, ys)
+    return buffer
+
+def products_less(a, b, c, d):
+    """
+    Returns `a` * `b` < `c` * `d` for (broadcast) int64 arrays, exactly even
+    where the products overflow int64
+    """
+    a, b, c, d = np.broadcast_arrays(a, b, c, d)
+    left = a.astype(np.float64) * b
+    right = c.astype(np.float64) * d
+    less = left < right
+    # The float products are exact below 2**53 and a few ulps off at most
+    # above, settle the close calls there with Python ints
+    largest = np.maximum(np.abs(left), np.abs(right))
+    close = (largest >= 2.0**53) & (np.abs(left - right) <= 1e-12 * largest)
+    for i in np.flatnonzero(close):
+        less[i] = int(a[i]) * int(b[i]) < int(c[i]) * int(d[i])
+    return less
+
+def region1_rows(radius_x, radius_y, columns):
+    """
+    Returns for each of the int64 array of `columns` X the largest y >= 0
+    whose region 1 midpoint (X, y - 1/2) is inside the ellipse, i.e.
+        radius_x**2 * (2y - 1)**2 < 4 * radius_y**2 * (radius_x**2 - X**2)
+    or 0 if there is none
+    """
+    rad_xsq, rad_ysq = radius_x**2, radius_y**2
+    room = rad_xsq - columns * columns
+    inside = lambda y: products_less(rad_xsq, (2 * y - 1)**2, 4 * rad_ysq,
+                                     room)
+    rows = np.floor((2 * radius_y * np.sqrt(np.maximum(room, 0)) / radius_x +
+                     1) / 2).astype(np.int64)
+    # Fix the float estimate, which is at most a row off
+    for _ in range(2):
+        rows -= (rows > 0) & ~inside(rows)
+        rows += inside(rows + 1)
+    return rows
+
+def region2_columns(radius_x, radius_y, rows):
+    """
+    Returns for each of the int64 array of `rows` Y the largest x >= -1
+    whose region 2 midpoint (x + 1/2, Y) is inside (or on) the ellipse, i.e.
+        radius_y**2 * (2x + 1)**2 <= 4 * radius_x**2 * (radius_y**2 - Y**2)
+    """
+    rad_xsq, rad_ysq = radius_x**2, radius_y**2
+    room = rad_ysq - rows * rows
+    inside = lambda x: ~products_less(4 * rad_xsq, room, rad_ysq,
+                                      (2 * x + 1)**2)
+    columns = np.floor((2 * radius_x * np.sqrt(np.maximum(room, 0)) /
+                        radius_y - 1) / 2).astype(np.int64)
+    columns = np.maximum(columns, -1)
+    for _ in range(2):
+        columns -= (columns > -1) & ~inside(columns)
+        columns += inside(columns + 1)
+    return columns
+
+def mirror(x, y):
+    """
+    Returns the (xs, ys) int32 arrays of the four points
+    (x, y), (x, -y), (-x, y), (-x, -y) of every step, step by step
+    """
+    xs = np.stack((x, x, -x, -x), axis=1).ravel()
+    ys = np.stack((y, -y, y, -y), axis=1).ravel()
+    return xs.astype(np.int32), ys.astype(np.int32)
+
+def ellipse_chunks(radius_x, radius_y, chunk_size=CHUNK_SIZE):
+    """
+    Returns a generator that gives the points of `ellipse_int()` (in the
+    same order) as (xs, ys) int32 arrays of up to 4 * `chunk_size` points,
+    computing `chunk_size` steps at a time in bulk.
+    The decisions of both regions have a closed form: in region 1 the row of
+    column X is the largest y with its midpoint inside the ellipse, except
+    that y only drops by one per step, so X + y is a running maximum. In
+    region 2 x chases the largest x with its midpoint inside, gaining at most
+    one per step, so x - k (k the step) is a running minimum.
+    """
+    rad_xsq, rad_ysq = radius_x**2, radius_y**2
+    yield (np.array([0], dtype=np.int32),
+           np.array([radius_y], dtype=np.int32))
+
+    # Region 1, while radius_y**2 * x < radius_x**2 * y, which ends about
+    # where the slope is -1
+    x, y = 0, radius_y
+    end_x = int(rad_xsq / max(math.hypot(radius_x, radius_y), 1)) + 2
+    while rad_ysq * x < rad_xsq * y:
+        columns = np.arange(x + 1, x + 1 + min(chunk_size, max(end_x - x, 1)),
+                            dtype=np.int64)
+        steps = np.maximum.accumulate(np.concatenate((
+            [x + y], columns + region1_rows(radius_x, radius_y, columns))))
+        rows = steps[1:] - columns
+        # Steps from a column where region 1 had already ended are not taken
+        taken = rad_ysq * (columns - 1) < rad_xsq * (steps[:-1] -
+                                                     columns + 1)
+        count = len(columns) if taken.all() else int(np.argmin(taken))
+        if count:
+            yield mirror(columns[:count], rows[:count])
+            x, y = int(columns[count - 1]), int(rows[count - 1])
+        if count < len(columns):
+            break
+
+    # Region 2, a row at a time down to y = 0
+    start_x, start_y = x, y
+    lowest = x
+    for first in range(1, start_y + 1, chunk_size):
+        step = np.arange(first, min(first + chunk_size, start_y + 1),
+                         dtype=np.int64)
+        rows = start_y - step
+        targets = np.maximum(region2_columns(radius_x, radius_y, rows) + 1,
+                             start_x)
+        lowest_steps = np.minimum.accumulate(np.concatenate((
+            [lowest], targets - step)))
+        lowest = int(lowest_steps[-1])
+        yield mirror(lowest_steps[1:] + step, rows)
+
+def ellipse_numpy(radius_x, radius_y, chunk_size=CHUNK_SIZE):
+    """
+    Returns the points of `ellipse_int()` (in the same order) as contiguous
+    (xs, ys) int32 arrays, generated in bulk by `ellipse_chunks()`
+    """
+    chunks = list(ellipse_chunks(radius_x, radius_y, chunk_size))
+    return (np.concatenate([xs for xs, _ in chunks]),
+            np.concatenate([ys for _, ys in chunks]))
+
 def translate(shift_x, shift_y, point):
     return Point(shift_x + point.x, shift_y + point.y)
 
+def translate_span(shift_x, shift_y, span):
+    return Span(shift_x + span.x0, shift_y + span.y0,
+                shift_x + span.x1, shift_y + span.y1)
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -96,19 +557,75 @@ if __name__ == '__main__':
                         type=int,
                         default=500,
                         help="Window size in pixels (equal width an height)")
+    parser.add_argument("--animate", "-a",
+                        action="store_true",
+                        help="Plot a pixel at a time, updating the display "
+                             "after each")
+    parser.add_argument("--arc",
+                        type=float,
+                        nargs=2,
+                        metavar=("START", "END"),
+                        default=None,
+                        help="Only plot the arc from START to END degrees "
+                             "(clockwise on the screen)")
+    parser.add_argument("--thickness", "-t",
+                        type=int,
+                        default=1,
+                        help="Pen width in pixels, a row of pixels at a time "
+                             "when above 1")
+    parser.add_argument("--fill", "-f",
+                        action="store_true",
+                        help="Fill the inside a row of pixels at a time")
+    parser.add_argument("--headless",
+                        action="store_true",
+                        help="Rasterize in memory at full speed without a "
+                             "window, print the time taken and exit")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the rasterized image to this PNG file")
     args = parser.parse_args()
 
     # Init display
-    pygame.display.init()
-    screen = pygame.display.set_mode((args.window_size, args.window_size))
-    surface = pygame.display.get_surface()
+    if args.headless:
+        target = framebuffer.Framebuffer(args.window_size, args.window_size)
+    else:
+        pygame.display.init()
+        screen = pygame.display.set_mode((args.window_size,
+                                          args.window_size))
+        surface = pygame.display.get_surface()
+        target = framebuffer.make_target(surface, args.animate)
+    start_time = time.perf_counter()
 
     # Plot generated points
-    for point in (translate(args.CENTER_X, args.CENTER_Y, point)
-                  for point in ellipse(args.RADIUS_X, args.RADIUS_Y)):
-        plot(point)
-        time.sleep(0.005)
-        pygame.display.update()
+    if args.fill:
+        target.plot_spans(translate_span(args.CENTER_X, args.CENTER_Y, span)
+                          for span in filled_ellipse(args.RADIUS_X,
+                                                     args.RADIUS_Y))
+    elif args.thickness > 1:
+        target.plot_spans(translate_span(args.CENTER_X, args.CENTER_Y, span)
+                          for span in thick_ellipse(args.RADIUS_X,
+                                                    args.RADIUS_Y,
+                                                    args.thickness))
+    elif args.arc:
+        start_angle, end_angle = map(math.radians, args.arc)
+        target.plot_many(translate(args.CENTER_X, args.CENTER_Y, point)
+                         for point in elliptical_arc(args.RADIUS_X,
+                                                     args.RADIUS_Y,
+                                                     start_angle, end_angle))
+    elif args.animate:
+        target.plot_many(translate(args.CENTER_X, args.CENTER_Y, point)
+                         for point in ellipse(args.RADIUS_X, args.RADIUS_Y))
+    else:
+        xs, ys = ellipse_numpy(args.RADIUS_X, args.RADIUS_Y)
+        target.plot_points(xs + args.CENTER_X, ys + args.CENTER_Y)
+    target.present()
+    elapsed = time.perf_counter() - start_time
+
+    if args.output:
+        target.save(args.output)
+    if args.headless:
+        print("Rasterized in {:.6f}s".format(elapsed))
+        sys.exit()
 
     # Wait till window quit
     while pygame.event.wait().type != pygame.QUIT:
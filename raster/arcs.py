@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Splits arcs into the symmetric sectors (octants of a circle, quadrants of an
+ellipse) the midpoint rasterizers walk, so only the sectors an arc passes
+through are rasterized
+"""
+import math
+
+TAU = 2 * math.pi
+
+
+def sector_pieces(start_angle, end_angle, count):
+    """
+    Split the arc from `start_angle` to `end_angle` (in radians, going
+    towards increasing angles, a full turn at most) into its pieces inside
+    the `count` equal sectors of the full turn, sector 0 starting at angle 0
+    Return:
+        list of (sector, low, high) in the order along the arc, with the
+        angles of the piece (in [0, 2 pi]) or None where it reaches the
+        sector boundary
+    """
+    span = end_angle - start_angle
+    span = TAU if span >= TAU else span % TAU
+    start = start_angle % TAU
+    end = start + span
+    width = TAU / count
+    pieces = []
+    sector = int(start // width)
+    while True:
+        low, high = sector * width, (sector + 1) * width
+        turn = (sector // count) * TAU
+        pieces.append((sector % count,
+                       start - turn if start > low else None,
+                       end - turn if end < high else None))
+        sector += 1
+        if sector * width >= end:
+            return pieces
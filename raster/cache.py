@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Memoizes the origin centred offsets of circles and ellipses, so drawing the
+same size at another centre is a vector add instead of a rerun of the
+midpoint algorithm
+"""
+import numpy as np
+import circle.bresenham_circle as bresenham_circle
+import ellipse.ellipse as ellipse
+from raster import lru
+
+# Default memory budget of a 'RasterCache()' in bytes
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class RasterCache(lru.LRUCache):
+    """
+    A least recently used cache of (xs, ys) offset arrays by key, holding at
+    most `max_bytes` of coordinates. The cached arrays are read only, as they
+    are shared by every caller.
+    """
+    def __init__(self, max_bytes=MAX_BYTES):
+        super().__init__(max_bytes)
+
+    @property
+    def max_bytes(self):
+        return self.max_size
+
+    @property
+    def nbytes(self):
+        return self.used
+
+    def size(self, offsets):
+        xs, ys = offsets
+        return xs.nbytes + ys.nbytes
+
+    def freeze(self, offsets):
+        xs, ys = offsets
+        xs, ys = np.ascontiguousarray(xs), np.ascontiguousarray(ys)
+        xs.setflags(write=False)
+        ys.setflags(write=False)
+        return xs, ys
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(nbytes=self.nbytes, max_bytes=self.max_bytes)
+        return stats
+
+    def __repr__(self):
+        return 'RasterCache({} entries, {} of {} bytes)'.format(
+            len(self), self.nbytes, self.max_bytes)
+
+
+# The cache used when none is given
+default_cache = RasterCache()
+
+
+def ellipse_offsets_uncached(radius_x, radius_y):
+    """
+    Return the points of the first quadrant of `ellipse_int()` mirrored to
+    all four quadrants by `mirror()`, without the duplicates on the axes, in
+    the order of their first occurrence, as (xs, ys) int32 arrays
+    """
+    xs, ys = ellipse.ellipse_numpy(radius_x, radius_y)
+    # After the top point every step gives its first quadrant point first
+    xs, ys = ellipse.mirror(np.concatenate((xs[:1], xs[1::4])),
+                            np.concatenate((ys[:1], ys[1::4])))
+    # Pack each point into one int64 to find the first occurrences
+    keys = (xs.astype(np.int64) << 32) | (ys.astype(np.int64) & 0xffffffff)
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    return xs[first], ys[first]
+
+
+def circle_offsets(radius, cache=None):
+    """
+    Return the (xs, ys) offsets of the circle of `radius` centred at the
+    origin (as given by `circle_numpy()`) from `cache` (the default cache
+    unless given)
+    """
+    cache = default_cache if cache is None else cache
+    return cache.get(('circle', radius),
+                     lambda: bresenham_circle.circle_numpy(radius))
+
+
+def ellipse_offsets(radius_x, radius_y, cache=None):
+    """
+    Return the (xs, ys) offsets of the ellipse with radii `radius_x` and
+    `radius_y` centred at the origin from `cache` (the default cache unless
+    given)
+    """
+    cache = default_cache if cache is None else cache
+    return cache.get(('ellipse', radius_x, radius_y),
+                     lambda: ellipse_offsets_uncached(radius_x, radius_y))
+
+
+def plot_offsets(target, offsets, center_x, center_y,
+                 color=(255, 255, 255)):
+    """
+    Plot the (xs, ys) `offsets` shifted to (`center_x`, `center_y`) into
+    `target`
+    """
+    xs, ys = offsets
+    target.plot_points(xs + center_x, ys + center_y, color)
+
+
+def plot_circle(target, center_x, center_y, radius, color=(255, 255, 255),
+                cache=None):
+    """
+    Plot the circle of `radius` centred at (`center_x`, `center_y`) into
+    `target`, rasterizing it only if its size is not cached
+    """
+    plot_offsets(target, circle_offsets(radius, cache), center_x, center_y,
+                 color)
+
+
+def plot_ellipse(target, center_x, center_y, radius_x, radius_y,
+                 color=(255, 255, 255), cache=None):
+    """
+    Plot the ellipse with radii `radius_x` and `radius_y` centred at
+    (`center_x`, `center_y`) into `target`, rasterizing it only if its size
+    is not cached
+    """
+    plot_offsets(target, ellipse_offsets(radius_x, radius_y, cache),
+                 center_x, center_y, color)
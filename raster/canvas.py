@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+An out-of-core raster target for canvases too large for memory, stored in a
+memory mapped file as square tiles so drawing touches only the pages of the
+tiles that receive pixels
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import cache as raster_cache
+from raster import clip as clipping
+from raster import framebuffer
+from raster import image
+from raster import polygon
+from bresanham_line.bresanham_line import bresanham_many
+
+# Width and height of a tile in pixels, a tile is 192 KiB
+TILE_SIZE = 256
+
+# Number of lines rasterized at a time by the demo
+CHUNK_SIZE = 1 << 16
+
+
+class TiledCanvas(object):
+    """
+    A `width` x `height` RGB canvas in the file `path`, a 'numpy.memmap' of
+    (tile rows, tile columns, `tile_size`, `tile_size`, 3) uint8 pixels, so
+    every tile is contiguous and the pixel at (`x`, `y`) is
+    `tiles[y // tile_size, x // tile_size, y % tile_size, x % tile_size]`.
+    The file starts out sparse: a tile is filled with the background only
+    when it first receives pixels (since the last `clear()`) and reads as
+    the background until then.
+    It plots like a 'Framebuffer()', so the rasterizers can draw into it.
+    """
+    def __init__(self, path, width, height, tile_size=TILE_SIZE,
+                 background=framebuffer.BLACK):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tile_rows = -(-height // tile_size)
+        self.tile_columns = -(-width // tile_size)
+        self.tiles = np.memmap(path, dtype=np.uint8, mode='w+',
+                               shape=(self.tile_rows, self.tile_columns,
+                                      tile_size, tile_size, 3))
+        self.touched = np.zeros((self.tile_rows, self.tile_columns),
+                                dtype=bool)
+        # Tiles whose pages hold pixels, stale ones after a `clear()`
+        self.written = np.zeros_like(self.touched)
+        self.background = np.asarray(background, dtype=np.uint8)
+
+    def touch(self, tile_ys, tile_xs):
+        """
+        Fill the tiles at the arrays of tile coordinates `tile_ys` and
+        `tile_xs` that were not touched since the last `clear()` with the
+        background, unless they were never written and it is black (the
+        zeros of the sparse file)
+        """
+        new = ~self.touched[tile_ys, tile_xs]
+        if not self.background.any():
+            new &= self.written[tile_ys, tile_xs]
+        for tile_y, tile_x in zip(tile_ys[new], tile_xs[new]):
+            self.tiles[tile_y, tile_x] = self.background
+        self.touched[tile_ys, tile_xs] = True
+        self.written[tile_ys, tile_xs] = True
+
+    def plot(self, point, color=framebuffer.WHITE):
+        """
+        Plot a colored pixel at `point`, dropping it if it is outside
+        """
+        x, y = point
+        self.plot_points(np.array([x]), np.array([y]), color)
+
+    def plot_points(self, xs, ys, color=framebuffer.WHITE):
+        """
+        Plot colored pixels at the coordinates in the arrays `xs` and `ys`,
+        dropping those outside. The pixels are sorted by tile (keeping their
+        order within a tile) and written with a single fancy indexed write.
+        `color` is one (R, G, B) for all pixels or an (N, 3) array of a color
+        per pixel
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        color = np.asarray(color, dtype=np.uint8)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys = xs[inside], ys[inside]
+        if color.ndim > 1:
+            color = color[inside]
+        if not len(xs):
+            return
+        tile_ys, tile_xs = ys // self.tile_size, xs // self.tile_size
+        tile = tile_ys * self.tile_columns + tile_xs
+        order = np.argsort(tile, kind='stable')
+        xs, ys, tile_ys, tile_xs = (xs[order], ys[order], tile_ys[order],
+                                    tile_xs[order])
+        if color.ndim > 1:
+            color = color[order]
+        used = np.unique(tile[order])
+        self.touch(used // self.tile_columns, used % self.tile_columns)
+        self.tiles[tile_ys, tile_xs, ys % self.tile_size,
+                   xs % self.tile_size] = color
+
+    def plot_many(self, points, color=framebuffer.WHITE):
+        """
+        Plot colored pixels at an iterable of `points`
+        """
+        points = np.array([tuple(point) for point in points],
+                          dtype=np.int64).reshape(-1, 2)
+        self.plot_points(points[:, 0], points[:, 1], color)
+
+    def blend_points(self, xs, ys, coverage, color=framebuffer.WHITE):
+        """
+        Blend `color` over the pixels at the coordinates in the arrays `xs`
+        and `ys` with the opacities in `coverage` (0 to 1, the largest one
+        where a pixel repeats), dropping those outside
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        coverage = np.asarray(coverage, dtype=np.float32)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys, coverage = xs[inside], ys[inside], coverage[inside]
+        if not len(xs):
+            return
+        pixels, repeats = np.unique(ys * self.width + xs, return_inverse=True)
+        alpha = np.zeros(len(pixels), dtype=np.float32)
+        np.maximum.at(alpha, repeats.reshape(-1), coverage)
+        ys, xs = pixels // self.width, pixels % self.width
+        tile_ys, tile_xs = ys // self.tile_size, xs // self.tile_size
+        used = np.unique(tile_ys * self.tile_columns + tile_xs)
+        self.touch(used // self.tile_columns, used % self.tile_columns)
+        index = (tile_ys, tile_xs, ys % self.tile_size, xs % self.tile_size)
+        old = self.tiles[index].astype(np.float32)
+        self.tiles[index] = np.rint(
+            old + (np.asarray(color, dtype=np.float32) - old) * alpha[:, None])
+
+    def plot_span(self, span, color=framebuffer.WHITE):
+        """
+        Plot a colored axis aligned run of pixels from (`span.x0`, `span.y0`)
+        to (`span.x1`, `span.y1`) (both inclusive) with a slice assignment
+        into every tile it crosses
+        """
+        x0, x1 = sorted((span.x0, span.x1))
+        y0, y1 = sorted((span.y0, span.y1))
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width - 1), min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        size = self.tile_size
+        for tile_y in range(y0 // size, y1 // size + 1):
+            top = tile_y * size
+            rows = slice(max(y0 - top, 0), min(y1 - top, size - 1) + 1)
+            for tile_x in range(x0 // size, x1 // size + 1):
+                left = tile_x * size
+                if not self.touched[tile_y, tile_x]:
+                    self.touch(np.array([tile_y]), np.array([tile_x]))
+                self.tiles[tile_y, tile_x, rows,
+                           max(x0 - left, 0):min(x1 - left, size - 1) + 1] = \
+                    color
+
+    def plot_spans(self, spans, color=framebuffer.WHITE):
+        """
+        Plot an iterable of colored spans
+        """
+        color = np.asarray(color, dtype=np.uint8)
+        for span in spans:
+            self.plot_span(span, color)
+
+    def clear(self, color=framebuffer.BLACK):
+        """
+        Make the whole canvas `color`, without touching any tile: the tiles
+        holding pixels are refilled when they are next drawn into
+        """
+        self.background = np.asarray(color, dtype=np.uint8)
+        self.touched[...] = False
+
+    def mark_dirty(self, x0, y0, x1, y1):
+        """
+        Nothing to do, the canvas is not displayed
+        """
+
+    def present(self):
+        """
+        Nothing to display, write the changed pages back to the file instead
+        """
+        self.flush()
+
+    def flush(self):
+        """
+        Write the changed pages back to the file
+        """
+        self.tiles.flush()
+
+    def rows(self):
+        """
+        Return a generator of the rows of pixels from top to bottom, each a
+        (width, 3) array, reading one row of tiles at a time (and none of
+        the tiles that were never touched)
+        """
+        size = self.tile_size
+        for tile_y in range(self.tile_rows):
+            band = np.empty((size, self.tile_columns * size, 3),
+                            dtype=np.uint8)
+            band[...] = self.background
+            for tile_x in np.flatnonzero(self.touched[tile_y]):
+                band[:, tile_x * size:(tile_x + 1) * size] = \
+                    self.tiles[tile_y, tile_x]
+            for row in band[:min(size, self.height - tile_y * size),
+                            :self.width]:
+                yield row
+
+    def save(self, path):
+        """
+        Stream the pixels a row at a time to the image file `path` (PNG, or
+        PPM or PBM by its extension)
+        """
+        image.write(path, self.width, self.height, self.rows())
+
+    def __repr__(self):
+        return 'TiledCanvas({!r}, {} x {}, {} of {} tiles touched)'.format(
+            self.path, self.width, self.height, int(self.touched.sum()),
+            self.touched.size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("CANVAS",
+                        help="File to store the canvas pixels in")
+    parser.add_argument("--size", "-s",
+                        type=int,
+                        default=50000,
+                        help="Canvas size in pixels (equal width and height)")
+    parser.add_argument("--tile-size",
+                        type=int,
+                        default=TILE_SIZE,
+                        help="Tile size in pixels (equal width and height)")
+    parser.add_argument("--lines", "-l",
+                        type=int,
+                        default=100000,
+                        help="Number of random lines to draw")
+    parser.add_argument("--circles", "-c",
+                        type=int,
+                        default=10000,
+                        help="Number of random circles and of random "
+                             "ellipses to draw")
+    parser.add_argument("--polygons", "-p",
+                        type=int,
+                        default=1000,
+                        help="Number of random star polygons to fill")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Stream the image to this PNG, PPM or PBM file")
+    args = parser.parse_args()
+
+    random = np.random.default_rng(0)
+    canvas = TiledCanvas(args.CANVAS, args.size, args.size, args.tile_size)
+    start_time = time.perf_counter()
+    window = clipping.window_rect(canvas.width, canvas.height)
+    for first in range(0, args.lines, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, args.lines - first)
+        starts = random.integers(0, args.size, (count, 2))
+        ends = starts + random.integers(-256, 257, (count, 2))
+        xs, ys, _ = bresanham_many(starts, ends, window)
+        canvas.plot_points(xs, ys, random.integers(64, 256, 3))
+    for x, y, radius_x, radius_y in zip(
+            *random.integers(0, args.size, (2, args.circles)),
+            *random.integers(1, 9, (2, args.circles)) * 16):
+        raster_cache.plot_circle(canvas, x, y, radius_x)
+        raster_cache.plot_ellipse(canvas, x, y, radius_x, radius_y)
+    polygons = [polygon.star(x, y, radius)
+                for x, y, radius in zip(
+                    random.uniform(0, args.size, args.polygons),
+                    random.uniform(0, args.size, args.polygons),
+                    random.uniform(8, 128, args.polygons))]
+    polygon.fill_polygons(canvas, polygons,
+                          random.integers(64, 256, (args.polygons, 3)))
+    canvas.flush()
+    elapsed = time.perf_counter() - start_time
+    print("Drew in {:.3f}s, {}".format(elapsed, canvas))
+    if args.output:
+        start_time = time.perf_counter()
+        canvas.save(args.output)
+        print("Wrote {} in {:.3f}s".format(args.output,
+                                          time.perf_counter() - start_time))
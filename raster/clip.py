@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Rectangular clip regions (usually the window), which the rasterizers clip
+their pixels to while stepping
+"""
+from collections import namedtuple
+
+# A simple point class
+Point = namedtuple('Point', ['x', 'y'])
+# An axis aligned rectangle of pixels, all bounds inclusive
+ClipRect = namedtuple('ClipRect', ['x_min', 'y_min', 'x_max', 'y_max'])
+
+
+def window_rect(width, height):
+    """
+    Return the 'ClipRect()' of a `width` x `height` window
+    """
+    return ClipRect(0, 0, width - 1, height - 1)
+
+
+def contains(rect, point):
+    """
+    Return whether `point` is inside `rect`
+    """
+    return (rect.x_min <= point.x <= rect.x_max and
+            rect.y_min <= point.y <= rect.y_max)
+
+
+def transform_rect(rect, transform):
+    """
+    Return the 'ClipRect()' covering `rect` after mapping it through
+    `transform`, which may only swap, negate and shift the axes (like the
+    octant transformations of the line rasterizers)
+    """
+    corner_a = transform(Point(rect.x_min, rect.y_min))
+    corner_b = transform(Point(rect.x_max, rect.y_max))
+    return ClipRect(min(corner_a.x, corner_b.x), min(corner_a.y, corner_b.y),
+                    max(corner_a.x, corner_b.x), max(corner_a.y, corner_b.y))
+
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+A compact binary display list format for scenes of lines, circles and
+ellipses, and a batch renderer that draws a whole (memory mapped) display
+list into one framebuffer
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import numpy as np
+
+# Make the shared modules and algorithm directories in the repository root
+# importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import cache as raster_cache
+from raster import clip as clipping
+from raster import framebuffer
+from bresanham_line.bresanham_line import bresanham_many
+import dda.dda as dda
+
+# File header: magic and size in bytes of a record
+MAGIC = b'RDL1'
+HEADER = struct.Struct('<4sI')
+
+# Opcodes and the meaning of their coords
+LINE = 1        # x0, y0, x1, y1 drawn with Bresenham's algorithm
+DDA_LINE = 2    # x0, y0, x1, y1 drawn with the (integer) DDA
+CIRCLE = 3      # center x, center y, radius, unused
+ELLIPSE = 4     # center x, center y, X radius, Y radius
+
+# A fixed width display list record, 20 bytes
+RECORD = np.dtype([('opcode', 'u1'), ('color', 'u1', (3,)),
+                   ('coords', '<i4', (4,))])
+
+# Number of records rendered at a time
+CHUNK_SIZE = 1 << 16
+
+
+def make_records(opcodes, coords, colors=framebuffer.WHITE):
+    """
+    Return a display list (an array of `RECORD`s) from arrays of `opcodes`,
+    (N, 4) `coords` and (N, 3) `colors` (or one color for all)
+    """
+    opcodes = np.asarray(opcodes)
+    records = np.zeros(len(opcodes), dtype=RECORD)
+    records['opcode'] = opcodes
+    records['coords'] = np.asarray(coords).reshape(-1, 4)
+    records['color'] = colors
+    return records
+
+
+def write(path, records):
+    """
+    Write the display list `records` to the file `path`
+    """
+    with open(path, 'wb') as display_list:
+        display_list.write(HEADER.pack(MAGIC, RECORD.itemsize))
+        np.ascontiguousarray(records, dtype=RECORD).tofile(display_list)
+
+
+def load(path):
+    """
+    Memory map the display list file `path`
+    Return:
+        read only array of `RECORD`s backed by the file
+    """
+    with open(path, 'rb') as display_list:
+        magic, size = HEADER.unpack(display_list.read(HEADER.size))
+    if magic != MAGIC or size != RECORD.itemsize:
+        raise ValueError('{} is not a display list'.format(path))
+    if os.path.getsize(path) == HEADER.size:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode='r', offset=HEADER.size)
+
+
+def chunk_pixels(chunk, window, cache):
+    """
+    Rasterize the records of `chunk`
+    Return:
+        (xs, ys, index of the record in `chunk` of each pixel)
+    """
+    opcodes = chunk['opcode']
+    coords = chunk['coords'].astype(np.int64)
+    records = np.arange(len(chunk))
+    parts = []
+
+    # All Bresenham lines at once
+    lines = records[opcodes == LINE]
+    if len(lines):
+        xs, ys, offsets = bresanham_many(coords[lines, :2], coords[lines, 2:],
+                                         window)
+        parts.append((xs, ys, np.repeat(lines, np.diff(offsets))))
+
+    for record in records[opcodes == DDA_LINE]:
+        x0, y0, x1, y1 = (int(value) for value in coords[record])
+        xs, ys = dda.dda_numpy(dda.Point(x0, y0), dda.Point(x1, y1), window)
+        parts.append((xs, ys, np.full(len(xs), record)))
+
+    # Circles and ellipses of the same size are the same cached offsets
+    # added to every center at once
+    for opcode, size_columns, offsets in (
+            (CIRCLE, 3, lambda size: raster_cache.circle_offsets(
+                size[0], cache)),
+            (ELLIPSE, 4, lambda size: raster_cache.ellipse_offsets(
+                size[0], size[1], cache))):
+        shapes = records[opcodes == opcode]
+        if not len(shapes):
+            continue
+        sizes = coords[shapes, 2:size_columns]
+        unique_sizes, groups = np.unique(sizes, axis=0, return_inverse=True)
+        groups = groups.reshape(-1)
+        for group, size in enumerate(unique_sizes):
+            members = shapes[groups == group]
+            offset_xs, offset_ys = offsets([int(value) for value in size])
+            parts.append(((coords[members, 0, None] + offset_xs).ravel(),
+                          (coords[members, 1, None] + offset_ys).ravel(),
+                          np.repeat(members, len(offset_xs))))
+
+    if not parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+def render(records, target, chunk_size=CHUNK_SIZE, cache=None):
+    """
+    Draw the display list `records` (e.g. from `load()`) in order into the
+    'Framebuffer()' `target`, `chunk_size` records at a time, later records
+    drawing over earlier ones
+    Return:
+        number of primitives drawn
+    """
+    window = clipping.window_rect(target.width, target.height)
+    # Last record of the chunk drawing each pixel, -1 for none
+    last_owner = np.full(target.width * target.height, -1, dtype=np.int64)
+    for first in range(0, len(records), chunk_size):
+        chunk = np.asarray(records[first:first + chunk_size])
+        xs, ys, owners = chunk_pixels(chunk, window, cache)
+        inside = ((xs >= 0) & (xs < target.width) &
+                  (ys >= 0) & (ys < target.height))
+        xs, ys, owners = xs[inside], ys[inside], owners[inside]
+        # Keep only the last record's writes of every pixel, so the order of
+        # the records decides and not that of the fancy indexed write
+        pixels = xs.astype(np.int64) * target.height + ys
+        np.maximum.at(last_owner, pixels, owners)
+        last = last_owner[pixels] == owners
+        last_owner[pixels] = -1
+        target.plot_points(xs[last], ys[last], chunk['color'][owners[last]])
+    return len(records)
+
+
+def random_scene(count, size, length=64, seed=0):
+    """
+    Return a display list of `count` random primitives of every kind on a
+    `size` x `size` canvas, lines up to `length` pixels along each axis and
+    circles and ellipses with a few distinct radii up to `length` / 2
+    """
+    random = np.random.default_rng(seed)
+    opcodes = random.choice([LINE, DDA_LINE, CIRCLE, ELLIPSE], count,
+                            p=[0.6, 0.1, 0.15, 0.15])
+    coords = random.integers(0, size, (count, 4))
+    coords[:, 2:] = coords[:, :2] + random.integers(-length, length + 1,
+                                                    (count, 2))
+    shapes = opcodes >= CIRCLE
+    coords[shapes, 2:] = random.integers(1, 9, (shapes.sum(), 2)) * max(
+        length // 16, 1)
+    colors = random.integers(64, 256, (count, 3))
+    return make_records(opcodes, coords, colors)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("DISPLAY_LIST",
+                        help="Display list file to render")
+    parser.add_argument("--generate", "-g",
+                        type=int,
+                        default=None,
+                        help="First write a display list of this many random "
+                             "primitives to DISPLAY_LIST")
+    parser.add_argument("--size", "-s",
+                        type=int,
+                        default=1024,
+                        help="Canvas size in pixels (equal width and height)")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the rendered image to this PNG file")
+    args = parser.parse_args()
+
+    if args.generate is not None:
+        write(args.DISPLAY_LIST, random_scene(args.generate, args.size))
+    records = load(args.DISPLAY_LIST)
+    target = framebuffer.Framebuffer(args.size, args.size)
+    start_time = time.perf_counter()
+    count = render(records, target)
+    elapsed = time.perf_counter() - start_time
+    print("{} primitives in {:.3f}s ({:,.0f} primitives/s)".format(
+        count, elapsed, count / elapsed if elapsed else 0))
+    if args.output:
+        target.save(args.output)
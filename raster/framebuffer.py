@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Raster targets for the primitive scripts to plot into
+"""
+import pygame
+import numpy as np
+import time
+from raster import image
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+# Copy the bounding box of all dirty rectangles instead, when there are more
+# than this many of them
+MAX_DIRTY_RECTS = 64
+
+
+class Framebuffer(object):
+    """
+    A (width, height, 3) uint8 NumPy array of pixels that is written in bulk
+    and copied onto a pygame `surface` (if any) once per frame by `present()`,
+    updating only the dirty rectangles.
+    The pixel at (`x`, `y`) is `pixels[x, y]`, same as 'pygame.surfarray'.
+    """
+    def __init__(self, width, height, surface=None, background=BLACK):
+        self.width = width
+        self.height = height
+        self.surface = surface
+        self.pixels = np.empty((width, height, 3), dtype=np.uint8)
+        self.pixels[...] = background
+        self.dirty = []
+
+    def mark_dirty(self, x0, y0, x1, y1):
+        """
+        Mark the pixels from (`x0`, `y0`) to (`x1`, `y1`) (both inclusive) as
+        changed since the last `present()`
+        """
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width - 1), min(y1, self.height - 1)
+        if x0 <= x1 and y0 <= y1:
+            self.dirty.append(pygame.Rect(x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+
+    def plot(self, point, color=WHITE):
+        """
+        Plot a colored pixel at `point`, dropping it if it is outside
+        """
+        x, y = point
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.pixels[x, y] = color
+            self.mark_dirty(x, y, x, y)
+
+    def plot_points(self, xs, ys, color=WHITE):
+        """
+        Plot colored pixels at the coordinates in the arrays `xs` and `ys`
+        with a single fancy indexed write, dropping those outside
+        `color` is one (R, G, B) for all pixels or an (N, 3) array of a color
+        per pixel
+        """
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        color = np.asarray(color)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.all():
+            xs = xs[inside]
+            ys = ys[inside]
+            if color.ndim == 2:
+                color = color[inside]
+        if len(xs):
+            self.pixels[xs, ys] = color
+            self.mark_dirty(int(xs.min()), int(ys.min()),
+                            int(xs.max()), int(ys.max()))
+
+    def plot_many(self, points, color=WHITE):
+        """
+        Plot colored pixels at an iterable of `points` in bulk
+        """
+        coords = np.array([tuple(point) for point in points],
+                          dtype=np.intp).reshape(-1, 2)
+        self.plot_points(coords[:, 0], coords[:, 1], color)
+
+    def blend_points(self, xs, ys, coverage, color=WHITE):
+        """
+        Blend `color` over the pixels at the coordinates in the arrays `xs`
+        and `ys` with the opacities in `coverage` (0 to 1, the largest one
+        where a pixel repeats), all in one vectorized read-modify-write,
+        dropping those outside
+        """
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        coverage = np.asarray(coverage, dtype=np.float32)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys, coverage = xs[inside], ys[inside], coverage[inside]
+        if not len(xs):
+            return
+        pixels, repeats = np.unique(xs.astype(np.int64) * self.height + ys,
+                                    return_inverse=True)
+        alpha = np.zeros(len(pixels), dtype=np.float32)
+        np.maximum.at(alpha, repeats.reshape(-1), coverage)
+        flat = self.pixels.reshape(-1, 3)
+        old = flat[pixels].astype(np.float32)
+        flat[pixels] = np.rint(
+            old + (np.asarray(color, dtype=np.float32) - old) * alpha[:, None])
+        self.mark_dirty(int(xs.min()), int(ys.min()),
+                        int(xs.max()), int(ys.max()))
+
+    def plot_span(self, span, color=WHITE):
+        """
+        Plot a colored axis aligned run of pixels from (`span.x0`, `span.y0`)
+        to (`span.x1`, `span.y1`) (both inclusive) with a slice assignment
+        """
+        x0, x1 = sorted((span.x0, span.x1))
+        y0, y1 = sorted((span.y0, span.y1))
+        self.pixels[max(x0, 0):max(x1 + 1, 0),
+                    max(y0, 0):max(y1 + 1, 0)] = color
+        self.mark_dirty(x0, y0, x1, y1)
+
+    def plot_spans(self, spans, color=WHITE):
+        """
+        Plot an iterable of colored spans, marking their bounding box dirty
+        once instead of every span
+        """
+        pixels = self.pixels
+        color = np.asarray(color, dtype=np.uint8)
+        left = top = float('inf')
+        right = bottom = -float('inf')
+        for span in spans:
+            x0, x1 = sorted((span.x0, span.x1))
+            y0, y1 = sorted((span.y0, span.y1))
+            pixels[max(x0, 0):max(x1 + 1, 0),
+                   max(y0, 0):max(y1 + 1, 0)] = color
+            left, top = min(left, x0), min(top, y0)
+            right, bottom = max(right, x1), max(bottom, y1)
+        if left <= right:
+            self.mark_dirty(left, top, right, bottom)
+
+    def clear(self, color=BLACK):
+        """
+        Fill the whole framebuffer with `color`
+        """
+        self.pixels[...] = color
+        self.mark_dirty(0, 0, self.width - 1, self.height - 1)
+
+    def rows(self):
+        """
+        Return a generator of the rows of pixels from top to bottom, each a
+        (width, 3) array
+        """
+        return (self.pixels[:, y] for y in range(self.height))
+
+    def save(self, path):
+        """
+        Write the pixels to the image file `path` (PNG, or PPM or PBM by its
+        extension)
+        """
+        image.write(path, self.width, self.height, self.rows())
+
+    def present(self):
+        """
+        Copy the dirty rectangles onto the surface and update the display
+        """
+        if self.surface is None or not self.dirty:
+            self.dirty = []
+            return
+        rects = self.dirty
+        if len(rects) > MAX_DIRTY_RECTS:
+            rects = [rects[0].unionall(rects[1:])]
+        view = pygame.surfarray.pixels3d(self.surface)
+        for rect in rects:
+            view[rect.left:rect.right, rect.top:rect.bottom] = \
+                self.pixels[rect.left:rect.right, rect.top:rect.bottom]
+        # Unlock the surface before the display uses it
+        del view
+        pygame.display.update(rects)
+        self.dirty = []
+
+
+class SurfaceTarget(object):
+    """
+    Plots straight into a pygame `surface` one pixel (or span) at a time,
+    updating the display and sleeping for `delay` seconds after each, to watch
+    an algorithm step by step
+    """
+    def __init__(self, surface, delay=0.005):
+        self.surface = surface
+        self.width, self.height = surface.get_size()
+        self.delay = delay
+
+    def step(self):
+        pygame.display.update()
+        time.sleep(self.delay)
+
+    def plot(self, point, color=WHITE):
+        """
+        Plot a colored pixel at `point`
+        """
+        self.surface.set_at(tuple(point), color)
+        self.step()
+
+    def plot_points(self, xs, ys, color=WHITE):
+        """
+        Plot colored pixels at the coordinates in `xs` and `ys`, `color` is
+        one (R, G, B) or an (N, 3) array of a color per pixel
+        """
+        colors = np.broadcast_to(np.asarray(color), (len(xs), 3))
+        for x, y, color in zip(xs, ys, colors):
+            self.plot((int(x), int(y)), tuple(int(value) for value in color))
+
+    def blend_points(self, xs, ys, coverage, color=WHITE):
+        """
+        Blend `color` over the pixels at the coordinates in `xs` and `ys`
+        with the opacities in `coverage`, a pixel at a time
+        """
+        for x, y, alpha in zip(xs, ys, coverage):
+            point = (int(x), int(y))
+            if not self.surface.get_rect().collidepoint(point):
+                continue
+            old = self.surface.get_at(point)
+            self.plot(point, tuple(int(round(o + (c - o) * float(alpha)))
+                                   for o, c in zip(old[:3], color)))
+
+    def plot_many(self, points, color=WHITE):
+        """
+        Plot colored pixels at an iterable of `points`
+        """
+        for point in points:
+            self.plot(point, color)
+
+    def plot_span(self, span, color=WHITE):
+        """
+        Plot a colored axis aligned run of pixels with a single fill
+        """
+        x0, x1 = sorted((span.x0, span.x1))
+        y0, y1 = sorted((span.y0, span.y1))
+        self.surface.fill(color, (x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+        self.step()
+
+    def plot_spans(self, spans, color=WHITE):
+        """
+        Plot an iterable of colored spans
+        """
+        for span in spans:
+            self.plot_span(span, color)
+
+    def clear(self, color=BLACK):
+        """
+        Fill the whole surface with `color`
+        """
+        self.surface.fill(color)
+
+    def save(self, path):
+        """
+        Write the surface to the image file `path`
+        """
+        pygame.image.save(self.surface, path)
+
+    def present(self):
+        """
+        Update the display
+        """
+        pygame.display.update()
+
+
+def make_target(surface, animate=False, delay=0.005):
+    """
+    Return a 'SurfaceTarget()' that plots step by step if `animate` is set,
+    else a 'Framebuffer()' the size of `surface`
+    """
+    if animate:
+        return SurfaceTarget(surface, delay)
+    width, height = surface.get_size()
+    return Framebuffer(width, height, surface)
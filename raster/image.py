@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Writes images straight from NumPy pixel rows, without pygame or a display
+"""
+import os
+import struct
+import zlib
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def png_chunk(kind, data):
+    """
+    Return the PNG chunk of type `kind` holding `data`
+    """
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def write_png(path, width, height, rows):
+    """
+    Write a `width` x `height` 8 bit RGB PNG to `path`.
+    `rows` is an iterable of the `height` rows from top to bottom, each a
+    (`width`, 3) uint8 array, which are compressed as they come so the whole
+    image never has to be in memory.
+    """
+    compressor = zlib.compressobj()
+    with open(path, 'wb') as png:
+        png.write(PNG_SIGNATURE)
+        png.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                 8, 2, 0, 0, 0)))
+        for row in rows:
+            # Every row starts with its filter type, 0 (none)
+            data = compressor.compress(b'\x00' + row.tobytes())
+            if data:
+                png.write(png_chunk(b'IDAT', data))
+        png.write(png_chunk(b'IDAT', compressor.flush()))
+        png.write(png_chunk(b'IEND', b''))
+
+
+def write_ppm(path, width, height, rows):
+    """
+    Write a `width` x `height` binary (P6) 8 bit RGB PPM to `path`, a row of
+    (`width`, 3) uint8 pixels of `rows` at a time
+    """
+    with open(path, 'wb') as ppm:
+        ppm.write('P6\n{} {}\n255\n'.format(width, height).encode('ascii'))
+        for row in rows:
+            ppm.write(np.ascontiguousarray(row, dtype=np.uint8).tobytes())
+
+
+def write_pbm(path, width, height, rows):
+    """
+    Write a `width` x `height` binary (P4) bitmap PBM to `path`, a row of
+    (`width`, 3) uint8 pixels of `rows` at a time, with every pixel that is
+    not black set (black in PBM terms)
+    """
+    with open(path, 'wb') as pbm:
+        pbm.write('P4\n{} {}\n'.format(width, height).encode('ascii'))
+        for row in rows:
+            pbm.write(np.packbits(np.asarray(row).any(axis=-1)).tobytes())
+
+
+# Image writers by file extension
+WRITERS = {'.png': write_png, '.ppm': write_ppm, '.pbm': write_pbm}
+
+
+def write(path, width, height, rows):
+    """
+    Write the image of `rows` (see `write_png()`) to `path` in the format
+    of its extension (PNG unless it is .ppm or .pbm)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    WRITERS.get(extension, write_png)(path, width, height, rows)
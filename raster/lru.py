@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+The least recently used cache the memoizing caches of the raster modules are
+built on
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A least recently used cache of values by key, holding values of a total
+    `size()` of at most `max_size`. Subclasses weigh the values by overriding
+    `size()` (1 each here) and prepare the computed values to be shared by
+    overriding `freeze()`.
+    """
+    def __init__(self, max_size):
+        if max_size < 1:
+            raise ValueError('a cache must hold at least 1, not {}'.format(
+                max_size))
+        self.max_size = max_size
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = OrderedDict()
+
+    def size(self, value):
+        """
+        Return how much of `max_size` `value` takes up
+        """
+        return 1
+
+    def freeze(self, value):
+        """
+        Return the computed `value` as it is cached and shared
+        """
+        return value
+
+    def get(self, key, compute):
+        """
+        Return the value cached for `key`, calling `compute()` for it and
+        caching it (evicting the least recently used entries to stay in
+        `max_size`) on a miss. Values larger than `max_size` are returned
+        without being cached.
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = self.freeze(compute())
+        size = self.size(value)
+        if size > self.max_size:
+            return value
+        while self.used + size > self.max_size:
+            _, old = self.entries.popitem(last=False)
+            self.used -= self.size(old)
+            self.evictions += 1
+        self.entries[key] = value
+        self.used += size
+        return value
+
+    def clear(self):
+        """
+        Drop all entries, keeping the counters
+        """
+        self.entries.clear()
+        self.used = 0
+
+    def stats(self):
+        """
+        Return the counters and usage as a dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'entries': len(self.entries),
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
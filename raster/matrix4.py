@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+4 x 4 homogeneous matrices for the 3D transformations and projections, and
+a matrix stack to build a model, view and projection up into one matrix
+that maps all points of a frame with a single multiply and divide
+"""
+import numpy as np
+from raster import rotation
+
+
+class Matrix4(object):
+    """
+    A 3D projective transformation as a 4 x 4 homogeneous `matrix` acting on
+    column vectors (x, y, z, 1). The chaining methods return a new
+    transformation that applies the current one first and then theirs, e.g.
+        Matrix4().rotate(angle, axis).translate(250, 250, -300)
+    rotates, then translates.
+    """
+    __slots__ = ('matrix',)
+
+    def __init__(self, matrix=None):
+        self.matrix = (np.identity(4) if matrix is None else
+                       np.array(matrix, dtype=np.float64).reshape(4, 4))
+
+    @classmethod
+    def translation(cls, shift_x, shift_y, shift_z):
+        matrix = np.identity(4)
+        matrix[:3, 3] = shift_x, shift_y, shift_z
+        return cls(matrix)
+
+    @classmethod
+    def scaling(cls, scale_x, scale_y, scale_z):
+        return cls(np.diag((scale_x, scale_y, scale_z, 1)))
+
+    @classmethod
+    def rotation(cls, angle, axis, cache=None):
+        """
+        Return the rotation by `angle` radians about the unit vector `axis`,
+        with its 3 x 3 matrix from the rotation matrix `cache`
+        """
+        matrix = np.identity(4)
+        matrix[:3, :3] = rotation.rotation_matrix(angle, axis, cache)
+        return cls(matrix)
+
+    @classmethod
+    def perspective_projection(cls, cam, screen_z):
+        """
+        Return the perspective projection onto the screen parallel to the XY
+        plane at Z `screen_z` with the center of projection `cam`, the
+        projective form of
+            x = cam.x + (screen_z - cam.z) * (cam.x - x) / (z - cam.z)
+        (and the same for y) with w = z - cam.z
+        """
+        depth = screen_z - cam.z
+        return cls([[-depth, 0, cam.x, cam.x * (depth - cam.z)],
+                    [0, -depth, cam.y, cam.y * (depth - cam.z)],
+                    [0, 0, screen_z, -screen_z * cam.z],
+                    [0, 0, 1, -cam.z]])
+
+    @classmethod
+    def parallel_projection(cls, screen_z=0):
+        """
+        Return the parallel projection onto the screen parallel to the XY
+        plane at Z `screen_z`
+        """
+        return cls([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, screen_z],
+                    [0, 0, 0, 1]])
+
+    def then(self, other):
+        """
+        Return the transformation applying this one and then `other`
+        """
+        return Matrix4(other.matrix @ self.matrix)
+
+    def __matmul__(self, other):
+        """
+        Return the transformation applying `other` and then this one, like
+        the product of their matrices
+        """
+        return Matrix4(self.matrix @ other.matrix)
+
+    def translate(self, shift_x, shift_y, shift_z):
+        return self.then(Matrix4.translation(shift_x, shift_y, shift_z))
+
+    def scale(self, scale_x, scale_y, scale_z):
+        return self.then(Matrix4.scaling(scale_x, scale_y, scale_z))
+
+    def rotate(self, angle, axis, cache=None):
+        return self.then(Matrix4.rotation(angle, axis, cache))
+
+    def perspective(self, cam, screen_z):
+        return self.then(Matrix4.perspective_projection(cam, screen_z))
+
+    def parallel(self, screen_z=0):
+        return self.then(Matrix4.parallel_projection(screen_z))
+
+    def inverse(self):
+        return Matrix4(np.linalg.inv(self.matrix))
+
+    def apply(self, points):
+        """
+        Return the (N, 3) float64 array of the (N, 3) array of `points`
+        transformed with one (N, 4) matrix multiply and one homogeneous
+        divide
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        homogeneous = points @ self.matrix[:, :3].T + self.matrix[:, 3]
+        return homogeneous[:, :3] / homogeneous[:, 3:]
+
+    def __eq__(self, other):
+        return (isinstance(other, Matrix4) and
+                np.array_equal(self.matrix, other.matrix))
+
+    def __repr__(self):
+        return 'Matrix4({})'.format(self.matrix.tolist())
+
+
+class MatrixStack(object):
+    """
+    A stack of 'Matrix4()'s whose `top` the transformations are appended to
+    (applied after it), with `push()` saving it and `pop()` going back to
+    it, e.g. one model and view shared by two projections.
+    """
+    def __init__(self, matrix=None):
+        self.top = Matrix4() if matrix is None else matrix
+        self.saved = []
+
+    def push(self):
+        """
+        Save the top matrix, to be restored by `pop()`
+        """
+        self.saved.append(self.top)
+        return self
+
+    def pop(self):
+        """
+        Restore and return the top matrix saved by the last `push()`
+        """
+        if not self.saved:
+            raise IndexError('pop from an empty matrix stack')
+        self.top = self.saved.pop()
+        return self.top
+
+    def load(self, matrix):
+        """
+        Replace the top matrix with `matrix`
+        """
+        self.top = matrix
+        return self
+
+    def then(self, matrix):
+        """
+        Append `matrix` to the top matrix
+        """
+        self.top = self.top.then(matrix)
+        return self
+
+    def translate(self, shift_x, shift_y, shift_z):
+        return self.then(Matrix4.translation(shift_x, shift_y, shift_z))
+
+    def scale(self, scale_x, scale_y, scale_z):
+        return self.then(Matrix4.scaling(scale_x, scale_y, scale_z))
+
+    def rotate(self, angle, axis, cache=None):
+        return self.then(Matrix4.rotation(angle, axis, cache))
+
+    def perspective(self, cam, screen_z):
+        return self.then(Matrix4.perspective_projection(cam, screen_z))
+
+    def parallel(self, screen_z=0):
+        return self.then(Matrix4.parallel_projection(screen_z))
+
+    def apply(self, points):
+        """
+        Return `points` transformed by the top matrix (see
+        `Matrix4.apply()`)
+        """
+        return self.top.apply(points)
+
+    def __len__(self):
+        return len(self.saved) + 1
+
+    def __repr__(self):
+        return 'MatrixStack({} deep, top {!r})'.format(len(self), self.top)
+
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Lazy pipelines of 2D and 3D point transformations, which fuse adjacent
+linear stages into one matrix and stream the points through them a chunk at
+a time, so point sets larger than memory can be transformed from disk
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+
+# Make the algorithm directories in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster.points import PointBuffer
+import transformations.transformations as transformations_2d
+import transformations_3d.transformations as transformations_3d
+
+# Number of points transformed at a time
+CHUNK_SIZE = 1 << 16
+
+# Kinds of stages
+MATRIX = 'matrix'      # a (d + 1) x (d + 1) homogeneous affine matrix
+INTIFY = 'intify'      # round to the nearest integers
+MAP = 'map'            # any function of an (n, d) chunk
+
+
+class Pipeline(object):
+    """
+    A chain of transformations of the `dimensions` (2 or 3) D points of
+    `source`, which is only recorded: every method returns a new pipeline
+    with one more stage and nothing runs until the pipeline is iterated
+    (giving 'Point()'s), or its `chunks()`, `array()` or `save()` are used.
+    `source` is an (N, `dimensions`) array (a 'numpy.memmap' too), the path
+    of such a .npy file (memory mapped), a 2D 'PointBuffer()' or an
+    iterable of points.
+    """
+    def __init__(self, source, dimensions=2, chunk_size=CHUNK_SIZE,
+                 stages=()):
+        if dimensions not in (2, 3):
+            raise ValueError('dimensions must be 2 or 3')
+        self.source = source
+        self.dimensions = dimensions
+        self.chunk_size = chunk_size
+        self.stages = tuple(stages)
+
+    def then(self, kind, value):
+        """
+        Return a new pipeline with the stage (`kind`, `value`) appended
+        """
+        return Pipeline(self.source, self.dimensions, self.chunk_size,
+                        self.stages + ((kind, value),))
+
+    def transform(self, matrix):
+        """
+        Append the homogeneous affine `matrix`, (d + 1) x (d + 1)
+        """
+        matrix = np.array(matrix, dtype=np.float64)
+        size = self.dimensions + 1
+        if matrix.shape != (size, size):
+            raise ValueError('expected a {0} x {0} matrix'.format(size))
+        return self.then(MATRIX, matrix)
+
+    def linear(self, matrix):
+        """
+        Append the d x d linear map `matrix`
+        """
+        homogeneous = np.identity(self.dimensions + 1)
+        homogeneous[:-1, :-1] = matrix
+        return self.transform(homogeneous)
+
+    def translate(self, *shifts):
+        homogeneous = np.identity(self.dimensions + 1)
+        homogeneous[:-1, -1] = shifts
+        return self.transform(homogeneous)
+
+    def scale(self, *factors):
+        return self.linear(np.diag(factors))
+
+    def rotate(self, angle, axis=None):
+        """
+        Append the rotation by `angle` radians, about the origin in 2D and
+        about the unit vector `axis` (e.g. a 'UnitVector()') in 3D
+        """
+        if self.dimensions == 2:
+            return self.transform(
+                transformations_2d.Affine2D.rotation(angle).matrix)
+        if axis is None:
+            raise ValueError('3D rotations need an axis')
+        return self.linear(transformations_3d.rotation_matrix(angle, axis))
+
+    def shear(self, shear_x, shear_y):
+        return self.transform(
+            transformations_2d.Affine2D.shearing(shear_x, shear_y).matrix)
+
+    def reflect(self, angle=0):
+        return self.transform(
+            transformations_2d.Affine2D.reflection(angle).matrix)
+
+    def intify(self):
+        """
+        Append rounding to the nearest integers (int32)
+        """
+        return self.then(INTIFY, None)
+
+    def map(self, function):
+        """
+        Append `function`, called with every (n, d) chunk and returning the
+        transformed chunk
+        """
+        return self.then(MAP, function)
+
+    def fused(self):
+        """
+        Return the stages with every run of adjacent matrices multiplied
+        into one and repeated roundings dropped
+        """
+        stages = []
+        for kind, value in self.stages:
+            if stages and kind == MATRIX and stages[-1][0] == MATRIX:
+                stages[-1] = (MATRIX, value @ stages[-1][1])
+            elif not (stages and kind == INTIFY and stages[-1][0] == INTIFY):
+                stages.append((kind, value))
+        return stages
+
+    def source_chunks(self):
+        """
+        Return a generator of the (n, d) chunks of the source points
+        """
+        source = self.source
+        if isinstance(source, (str, os.PathLike)):
+            source = np.load(source, mmap_mode='r')
+        if isinstance(source, PointBuffer):
+            xs, ys = source.arrays()
+            for first in range(0, len(xs), self.chunk_size):
+                chunk = slice(first, first + self.chunk_size)
+                yield np.column_stack((xs[chunk], ys[chunk]))
+        elif isinstance(source, np.ndarray):
+            source = source.reshape(-1, self.dimensions)
+            for first in range(0, len(source), self.chunk_size):
+                yield np.asarray(source[first:first + self.chunk_size])
+        else:
+            points = iter(source)
+            while True:
+                chunk = list(itertools.islice(points, self.chunk_size))
+                if not chunk:
+                    return
+                yield np.array(chunk, dtype=np.float64).reshape(
+                    -1, self.dimensions)
+
+    def chunks(self):
+        """
+        Return a generator of the transformed (n, d) chunks, float64 or
+        int32 after a final `intify()`
+        """
+        stages = self.fused()
+        for chunk in self.source_chunks():
+            for kind, value in stages:
+                if kind == MATRIX:
+                    chunk = chunk @ value[:-1, :-1].T + value[:-1, -1]
+                elif kind == INTIFY:
+                    chunk = np.rint(chunk).astype(np.int32)
+                else:
+                    chunk = value(chunk)
+            yield chunk
+
+    def __iter__(self):
+        point = (transformations_2d.Point if self.dimensions == 2 else
+                 transformations_3d.Point)
+        for chunk in self.chunks():
+            for coordinates in chunk.tolist():
+                yield point(*coordinates)
+
+    def array(self):
+        """
+        Return all transformed points as one (N, d) array
+        """
+        chunks = list(self.chunks())
+        if not chunks:
+            return np.zeros((0, self.dimensions))
+        return np.concatenate(chunks)
+
+    def save(self, path, count):
+        """
+        Stream the `count` transformed points into the .npy file `path` a
+        chunk at a time (of float64, or int32 if the last stage is
+        `intify()`)
+        Return:
+            the (read only) memory mapped result
+        """
+        stages = self.fused()
+        dtype = np.int32 if stages and stages[-1][0] == INTIFY else np.float64
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                        shape=(count, self.dimensions))
+        written = 0
+        for chunk in self.chunks():
+            out[written:written + len(chunk)] = chunk
+            written += len(chunk)
+        if written != count:
+            raise ValueError('{} points, not {}'.format(written, count))
+        out.flush()
+        del out
+        return np.load(path, mmap_mode='r')
+
+    def __repr__(self):
+        return 'Pipeline({}D, {})'.format(
+            self.dimensions, ' -> '.join(kind for kind, _ in self.stages))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("INPUT",
+                        help=".npy file of (N, 3) points to transform")
+    parser.add_argument("OUTPUT",
+                        help=".npy file to write the transformed points to")
+    parser.add_argument("--generate", "-g",
+                        type=int,
+                        default=None,
+                        help="First write this many random points to INPUT")
+    parser.add_argument("--chunk-size", "-c",
+                        type=int,
+                        default=CHUNK_SIZE,
+                        help="Number of points transformed at a time")
+    args = parser.parse_args()
+
+    if args.generate is not None:
+        random = np.random.default_rng(0)
+        points = np.lib.format.open_memmap(args.INPUT, mode='w+',
+                                           dtype=np.float64,
+                                           shape=(args.generate, 3))
+        for first in range(0, args.generate, args.chunk_size):
+            count = min(args.chunk_size, args.generate - first)
+            points[first:first + count] = random.uniform(-100, 100,
+                                                         (count, 3))
+        points.flush()
+        del points
+
+    count = len(np.load(args.INPUT, mmap_mode='r'))
+    pipeline = (Pipeline(args.INPUT, 3, args.chunk_size)
+                .translate(-50, -50, -50)
+                .rotate(np.radians(30), transformations_3d.UnitVector(1, 1, 0))
+                .scale(2, 2, 2)
+                .translate(200, 200, 0)
+                .intify())
+    start_time = time.perf_counter()
+    pipeline.save(args.OUTPUT, count)
+    elapsed = time.perf_counter() - start_time
+    print("{} points through {} ({} fused stages) in {:.3f}s "
+          "({:,.0f} points/s)".format(count, pipeline, len(pipeline.fused()),
+                                      elapsed, count / elapsed))
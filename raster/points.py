@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compact array backed storage for large numbers of 2D points
+"""
+from array import array
+import numpy as np
+
+# NumPy dtypes of the 'array' typecodes a 'PointBuffer()' can hold
+DTYPES = {'i': np.intc, 'd': np.float64}
+
+
+class PointView(object):
+    """
+    A view of the point at `index` of a 'PointBuffer()' for the occasional
+    per point access, reading and writing straight through to the buffer
+    """
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def x(self):
+        return self.buffer.xs[self.index]
+
+    @x.setter
+    def x(self, value):
+        self.buffer.xs[self.index] = value
+
+    @property
+    def y(self):
+        return self.buffer.ys[self.index]
+
+    @y.setter
+    def y(self, value):
+        self.buffer.ys[self.index] = value
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __repr__(self):
+        return 'PointView(x={}, y={})'.format(self.x, self.y)
+
+
+class PointBuffer(object):
+    """
+    A growable sequence of 2D points stored as two 'array' columns `xs` and
+    `ys` of C ints (typecode 'i') or doubles ('d') instead of a tuple per
+    point, which the rasterizers fill and the targets and transformations
+    consume in bulk through `arrays()`
+    """
+    __slots__ = ('xs', 'ys')
+
+    def __init__(self, typecode='i'):
+        self.xs = array(typecode)
+        self.ys = array(typecode)
+
+    @classmethod
+    def from_arrays(cls, xs, ys, typecode=None):
+        """
+        Return a new buffer holding a copy of the coordinates in the arrays
+        `xs` and `ys`, of floats if they are floats and else of ints
+        """
+        xs = np.asarray(xs)
+        if typecode is None:
+            typecode = 'd' if xs.dtype.kind == 'f' else 'i'
+        buffer = cls(typecode)
+        buffer.extend(xs, ys)
+        return buffer
+
+    @classmethod
+    def from_points(cls, points, typecode='i'):
+        """
+        Return a new buffer holding the coordinates of an iterable of `points`
+        """
+        buffer = cls(typecode)
+        for x, y in points:
+            buffer.append(x, y)
+        return buffer
+
+    @property
+    def typecode(self):
+        return self.xs.typecode
+
+    @property
+    def nbytes(self):
+        return (len(self.xs) + len(self.ys)) * self.xs.itemsize
+
+    def append(self, x, y):
+        """
+        Add the point (`x`, `y`)
+        """
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def extend(self, xs, ys):
+        """
+        Add the points with coordinates from the arrays `xs` and `ys`
+        """
+        dtype = DTYPES[self.typecode]
+        self.xs.frombytes(np.ascontiguousarray(xs, dtype=dtype).tobytes())
+        self.ys.frombytes(np.ascontiguousarray(ys, dtype=dtype).tobytes())
+
+    def clear(self):
+        """
+        Remove all points, keeping the typecode
+        """
+        del self.xs[:]
+        del self.ys[:]
+
+    def arrays(self):
+        """
+        Return (xs, ys) NumPy arrays sharing memory with the buffer, so
+        changes to them change the points. The buffer can not grow while
+        they are alive.
+        """
+        dtype = DTYPES[self.typecode]
+        return (np.frombuffer(self.xs, dtype=dtype),
+                np.frombuffer(self.ys, dtype=dtype))
+
+    def translate(self, shift_x, shift_y):
+        """
+        Shift all points by (`shift_x`, `shift_y`) in place, in bulk
+        """
+        xs, ys = self.arrays()
+        xs += shift_x
+        ys += shift_y
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('point index out of range')
+        return PointView(self, index)
+
+    def __iter__(self):
+        return (PointView(self, index) for index in range(len(self)))
+
+    def __repr__(self):
+        return 'PointBuffer({!r}, {} points)'.format(self.typecode, len(self))
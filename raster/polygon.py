@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Fills polygons (concave and self intersecting ones too) a scanline at a time
+with a sorted edge table and an active edge list stepped in integers
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import clip as clipping
+from raster import framebuffer
+
+# An axis aligned run of pixels from (x0, y0) to (x1, y1), both inclusive
+Span = namedtuple('Span', ['x0', 'y0', 'x1', 'y1'])
+
+# Fill rules deciding which parts of a self intersecting polygon are inside
+EVEN_ODD = 'even-odd'
+NON_ZERO = 'non-zero'
+
+
+class Edge(object):
+    """
+    A non horizontal polygon edge crossing the scanlines from `y_min` up to
+    (not including) `y_max`. Its crossing with the current scanline is at
+    x = `x` + `remainder` / `height` exactly, with 0 <= `remainder` <
+    `height`, and moves by `step` + `step_remainder` / `height` per scanline.
+    `winding` is +1 for edges going down (towards increasing y) and -1 for
+    edges going up.
+    """
+    __slots__ = ('y_min', 'y_max', 'x', 'remainder', 'height', 'step',
+                 'step_remainder', 'winding')
+
+    def __init__(self, start, end):
+        self.winding = 1
+        if start[1] > end[1]:
+            start, end = end, start
+            self.winding = -1
+        (x0, y0), (x1, y1) = start, end
+        self.y_min, self.y_max = y0, y1
+        self.height = y1 - y0
+        self.step, self.step_remainder = divmod(x1 - x0, self.height)
+        self.x, self.remainder = x0, 0
+
+    def start_at(self, y):
+        """
+        Move the crossing straight to scanline `y`
+        """
+        self.x, self.remainder = divmod(
+            self.x * self.height + self.remainder +
+            (y - self.y_min) * (self.step * self.height + self.step_remainder),
+            self.height)
+        self.y_min = y
+
+    def advance(self):
+        """
+        Move the crossing to the next scanline
+        """
+        self.x += self.step
+        self.remainder += self.step_remainder
+        if self.remainder >= self.height:
+            self.x += 1
+            self.remainder -= self.height
+
+    def first_pixel(self):
+        """
+        Return the first pixel column at or right of the crossing
+        """
+        return self.x + (self.remainder > 0)
+
+    def sort_key(self):
+        return self.x + self.remainder / self.height
+
+
+def edge_table(points):
+    """
+    Return the non horizontal edges of the closed polygon through `points`
+    (rounded to whole pixels) sorted by their first scanline
+    """
+    points = [(int(round(x)), int(round(y))) for x, y in points]
+    edges = [Edge(start, end)
+             for start, end in zip(points, points[1:] + points[:1])
+             if start[1] != end[1]]
+    edges.sort(key=lambda edge: edge.y_min)
+    return edges
+
+
+def polygon_spans(points, rule=EVEN_ODD, clip=None):
+    """
+    Returns a generator that gives the horizontal 'Span()'s filling the
+    closed polygon through `points` (its vertices rounded to whole pixels),
+    scanline by scanline from the top, with the even-odd or non-zero winding
+    `rule` for self intersecting polygons.
+    A pixel is filled if its center is inside, or on a left or top edge, so
+    polygons sharing an edge do not overlap.
+    If `clip` is a 'ClipRect()' only the scanlines inside it are visited and
+    the spans are cut to it.
+    """
+    edges = edge_table(points)
+    if not edges:
+        return
+    y_first = edges[0].y_min
+    y_last = max(edge.y_max for edge in edges) - 1
+    x_min, x_max = -math.inf, math.inf
+    if clip is not None:
+        y_first = max(y_first, clip.y_min)
+        y_last = min(y_last, clip.y_max)
+        x_min, x_max = clip.x_min, clip.x_max
+
+    pending = 0
+    active = []
+    for y in range(y_first, y_last + 1):
+        # Move the edges starting by this scanline from the edge table into
+        # the active edge list
+        while pending < len(edges) and edges[pending].y_min <= y:
+            edge = edges[pending]
+            if edge.y_max > y:
+                if edge.y_min < y:
+                    edge.start_at(y)
+                active.append(edge)
+            pending += 1
+        # Crossings only swap places where edges intersect, so this sort of
+        # an almost sorted list is linear most of the time
+        active.sort(key=Edge.sort_key)
+
+        # Spans run from where the winding leaves 0 to where it is back to 0
+        winding = 0
+        for edge in active:
+            outside = winding == 0
+            if rule == EVEN_ODD:
+                winding ^= 1
+            else:
+                winding += edge.winding
+            if outside and winding:
+                left = max(edge.first_pixel(), x_min)
+            elif not outside and not winding:
+                right = min(edge.first_pixel() - 1, x_max)
+                if left <= right:
+                    yield Span(left, y, right, y)
+        # Step the edges to the next scanline, dropping those that end
+        active = [edge for edge in active if edge.y_max > y + 1]
+        for edge in active:
+            edge.advance()
+
+
+def fill_polygons(target, polygons, colors=framebuffer.WHITE, rule=EVEN_ODD):
+    """
+    Fill every polygon of `polygons` (each a sequence of points) into
+    `target` with one span write per run of pixels, in the matching color of
+    `colors` or all in one color
+    """
+    window = clipping.window_rect(target.width, target.height)
+    colors = np.broadcast_to(np.asarray(colors), (len(polygons), 3))
+    for polygon, color in zip(polygons, colors):
+        target.plot_spans(polygon_spans(polygon, rule, window),
+                          tuple(int(value) for value in color))
+
+
+def star(center_x, center_y, radius, corners=5, turn=2):
+    """
+    Return the points of a (self intersecting for `turn` > 1) star polygon
+    joining every `turn`th of `corners` points on a circle
+    """
+    return [(center_x + radius * math.cos(2 * math.pi * turn * i / corners),
+             center_y + radius * math.sin(2 * math.pi * turn * i / corners))
+            for i in range(corners)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("POLYGONS",
+                        type=int,
+                        help="Number of random star polygons to fill")
+    parser.add_argument("--size", "-s",
+                        type=int,
+                        default=1024,
+                        help="Canvas size in pixels (equal width and height)")
+    parser.add_argument("--radius", "-r",
+                        type=int,
+                        default=20,
+                        help="Largest radius of the polygons")
+    parser.add_argument("--rule",
+                        choices=(EVEN_ODD, NON_ZERO),
+                        default=EVEN_ODD,
+                        help="Fill rule")
+    parser.add_argument("--output", "-o",
+                        default=None,
+                        help="Write the image to this PNG file")
+    args = parser.parse_args()
+
+    random = np.random.default_rng(0)
+    polygons = [star(x, y, radius)
+                for x, y, radius in zip(
+                    random.uniform(0, args.size, args.POLYGONS),
+                    random.uniform(0, args.size, args.POLYGONS),
+                    random.uniform(2, args.radius, args.POLYGONS))]
+    colors = random.integers(64, 256, (args.POLYGONS, 3))
+    target = framebuffer.Framebuffer(args.size, args.size)
+    start_time = time.perf_counter()
+    fill_polygons(target, polygons, colors, args.rule)
+    elapsed = time.perf_counter() - start_time
+    print("{} polygons in {:.3f}s ({:,.0f} polygons/s)".format(
+        args.POLYGONS, elapsed, args.POLYGONS / elapsed))
+    if args.output:
+        target.save(args.output)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Memoizes the 3 x 3 matrices of 3D rotations by (axis, angle), so the
+animations sweeping the same angles every frame, face and run build every
+matrix only once, optionally from sine and cosine tables of whole degrees
+"""
+import math
+from raster import lru
+
+# Default number of matrices a 'RotationCache()' holds
+MAX_MATRICES = 4096
+
+# Sines and cosines of the whole degrees 0 to 359, exact at the multiples of
+# 90 degrees
+SIN_TABLE = tuple(0.0 if degrees % 180 == 0 else
+                  math.copysign(1.0, 180 - degrees) if degrees % 90 == 0 else
+                  math.sin(math.radians(degrees))
+                  for degrees in range(360))
+COS_TABLE = SIN_TABLE[90:] + SIN_TABLE[:90]
+
+
+def sin_cos(angle, tables=False):
+    """
+    Return (sin, cos) of `angle` radians, looked up in `SIN_TABLE` and
+    `COS_TABLE` if `tables` is set and `angle` is a whole number of degrees
+    """
+    if tables:
+        degrees = math.degrees(angle)
+        whole = round(degrees)
+        if abs(degrees - whole) < 1e-9:
+            return SIN_TABLE[whole % 360], COS_TABLE[whole % 360]
+    return math.sin(angle), math.cos(angle)
+
+
+def rodrigues(angle, axis, tables=False):
+    """
+    Return the 3 x 3 matrix (a tuple of row tuples) of the rotation by
+    `angle` radians about the unit vector `axis` (Rodrigues' rotation
+    formula), with one sine and one cosine
+    """
+    sin, cos = sin_cos(angle, tables)
+    l, m, n = axis.x, axis.y, axis.z
+    versine = 1 - cos
+    return ((l * l * versine + cos,
+             m * l * versine - n * sin,
+             n * l * versine + m * sin),
+            (l * m * versine + n * sin,
+             m * m * versine + cos,
+             n * m * versine - l * sin),
+            (l * n * versine - m * sin,
+             m * n * versine + l * sin,
+             n * n * versine + cos))
+
+
+class RotationCache(lru.LRUCache):
+    """
+    A least recently used cache of at most `max_matrices` rotation matrices
+    by (axis, angle), built with the whole degree tables if `tables` is set.
+    The matrices are tuples, as they are shared by every caller.
+    """
+    def __init__(self, max_matrices=MAX_MATRICES, tables=False):
+        super().__init__(max_matrices)
+        self.tables = tables
+
+    @property
+    def max_matrices(self):
+        return self.max_size
+
+    def matrix(self, angle, axis):
+        """
+        Return the matrix of the rotation by `angle` radians about the unit
+        vector `axis`, building and caching it (evicting the least recently
+        used matrix if full) on a miss
+        """
+        return self.get((axis.x, axis.y, axis.z, angle),
+                        lambda: rodrigues(angle, axis, self.tables))
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(max_matrices=self.max_matrices)
+        return stats
+
+    def __repr__(self):
+        return 'RotationCache({} of {} matrices)'.format(len(self),
+                                                         self.max_matrices)
+
+
+# The cache used when none is given
+default_cache = RotationCache()
+
+
+def rotation_matrix(angle, axis, cache=None):
+    """
+    Return the matrix of the rotation by `angle` radians about the unit
+    vector `axis` from `cache` (the default cache unless given)
+    """
+    cache = default_cache if cache is None else cache
+    return cache.matrix(angle, axis)
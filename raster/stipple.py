@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Dash patterns (stipples) of lines as bit masks, applied along the major axis
+of the line rasterizers by walking only the runs of steps that are on
+"""
+from collections import namedtuple
+import numpy as np
+
+# A repeating line pattern of `bits` bits, bit i (from the least significant)
+# of `mask` telling whether steps i * `factor` to (i + 1) * `factor` - 1 of
+# the line are plotted, like OpenGL's line stipple
+Stipple = namedtuple('Stipple', ['mask', 'factor', 'bits'], defaults=(1, 16))
+
+SOLID = Stipple(0xffff)
+DASHED = Stipple(0x00ff)
+DOTTED = Stipple(0x5555)
+DASH_DOT = Stipple(0x27ff)
+
+
+def period(stipple):
+    """
+    Return the number of steps after which `stipple` repeats
+    """
+    return stipple.bits * stipple.factor
+
+
+def pattern_runs(stipple):
+    """
+    Return the (first, last) steps, both inclusive, of the runs that are on
+    in one period of `stipple`
+    """
+    runs = []
+    bit = 0
+    while bit < stipple.bits:
+        if not stipple.mask >> bit & 1:
+            bit += 1
+            continue
+        first = bit
+        while bit < stipple.bits and stipple.mask >> bit & 1:
+            bit += 1
+        runs.append((first * stipple.factor, bit * stipple.factor - 1))
+    return runs
+
+
+def on_runs(stipple, first, last):
+    """
+    Returns a generator that gives the (first, last) steps, both inclusive,
+    of the runs of steps from `first` to `last` that are on in `stipple`, in
+    increasing order, so a rasterizer can jump over the steps that are off
+    """
+    runs = pattern_runs(stipple)
+    length = period(stipple)
+    for start in range(first - first % length, last + 1, length):
+        for run_first, run_last in runs:
+            run_first = max(start + run_first, first)
+            run_last = min(start + run_last, last)
+            if run_first <= run_last:
+                yield run_first, run_last
+
+
+def is_on(stipple, step):
+    """
+    Return whether `step` is on in `stipple`
+    """
+    return bool(stipple.mask >> (step // stipple.factor % stipple.bits) & 1)
+
+
+def step_mask(stipple, steps):
+    """
+    Return the boolean array of whether each of the array of `steps` is on in
+    `stipple`
+    """
+    bits = np.asarray(steps) // stipple.factor % stipple.bits
+    return (stipple.mask >> bits & 1).astype(bool)
+
+
+def parse(text, factor=1, bits=16):
+    """
+    Return the 'Stipple()' with the mask written in `text` (e.g. '0x00ff' or
+    '0b1100')
+    """
+    return Stipple(int(text, 0), factor, bits)
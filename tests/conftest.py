@@ -0,0 +1,9 @@
+"""
+Makes the shared modules and algorithm directories in the repository root
+importable by the tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
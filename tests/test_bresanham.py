@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Checks of the batched, clipped, stippled and span Bresenham rasterizers
+against the per-pixel `bresanham()`
+"""
+
+from bresanham_line.bresanham_line import (Point, bresanham, bresanham_many,
+                                           bresanham_spans)
+from raster.clip import ClipRect, contains
+from raster.stipple import Stipple, is_on
+
+START = Point(3, -2)
+# Every octant, both diagonals, the axes and a zero length line
+DIFFS = [(xdiff, ydiff) for xdiff in range(-9, 10) for ydiff in range(-9, 10)]
+CLIPS = [ClipRect(-4, -6, 7, 1), ClipRect(4, -2, 4, 5),
+         ClipRect(-20, 3, 20, 9), ClipRect(10, 10, 20, 20)]
+
+
+def lines():
+    for xdiff, ydiff in DIFFS:
+        yield START, Point(START.x + xdiff, START.y + ydiff)
+
+
+def expand(spans):
+    pixels = []
+    for span in spans:
+        step_x = 1 if span.x1 >= span.x0 else -1
+        step_y = 1 if span.y1 >= span.y0 else -1
+        if span.y0 == span.y1:
+            pixels += [Point(x, span.y0)
+                       for x in range(span.x0, span.x1 + step_x, step_x)]
+        else:
+            pixels += [Point(span.x0, y)
+                       for y in range(span.y0, span.y1 + step_y, step_y)]
+    return pixels
+
+
+def unique(pixels):
+    return list(dict.fromkeys(pixels))
+
+
+def test_many_matches_bresanham():
+    starts, ends = zip(*lines())
+    xs, ys, offsets = bresanham_many(starts, ends)
+    for i, (start, end) in enumerate(lines()):
+        line = slice(offsets[i], offsets[i + 1])
+        assert (list(map(Point, xs[line].tolist(), ys[line].tolist())) ==
+                list(bresanham(start, end)))
+
+
+def test_clip_matches_bresanham():
+    starts, ends = zip(*lines())
+    for clip in CLIPS:
+        xs, ys, offsets = bresanham_many(starts, ends, clip)
+        for i, (start, end) in enumerate(lines()):
+            expected = [point for point in bresanham(start, end)
+                        if contains(clip, point)]
+            assert list(bresanham(start, end, clip)) == expected
+            line = slice(offsets[i], offsets[i + 1])
+            assert (list(map(Point, xs[line].tolist(), ys[line].tolist())) ==
+                    expected)
+
+
+def test_pattern_matches_bresanham():
+    pattern = Stipple(0b1100101, 2)
+    starts, ends = zip(*lines())
+    xs, ys, offsets = bresanham_many(starts, ends, CLIPS[0], pattern)
+    for i, (start, end) in enumerate(lines()):
+        # The start point is step 0, then the steps along the major axis
+        expected = [point for step, point in enumerate(bresanham(start, end))
+                    if contains(CLIPS[0], point) and
+                    is_on(pattern, max(step - 1, 0))]
+        assert list(bresanham(start, end, CLIPS[0], pattern)) == expected
+        line = slice(offsets[i], offsets[i + 1])
+        assert (list(map(Point, xs[line].tolist(), ys[line].tolist())) ==
+                expected)
+
+
+def test_spans_match_bresanham():
+    for start, end in lines():
+        assert expand(bresanham_spans(start, end)) == unique(
+            bresanham(start, end))
+        for clip in CLIPS:
+            assert expand(bresanham_spans(start, end, clip)) == unique(
+                point for point in bresanham(start, end)
+                if contains(clip, point))
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Checks of the cached circle and ellipse offsets
+"""
+
+from raster import cache
+import ellipse.ellipse as ellipse
+
+
+def test_ellipse_offsets_match_walk():
+    for radius_x in range(0, 24):
+        for radius_y in range(0, 24):
+            xs, ys = cache.ellipse_offsets_uncached(radius_x, radius_y)
+            offsets = list(zip(xs.tolist(), ys.tolist()))
+            assert len(offsets) == len(set(offsets))
+            walk = set(ellipse.ellipse_walk(radius_x, radius_y, 0, radius_y))
+            assert set(offsets) == {(sign_x * x, sign_y * y)
+                                    for x, y in walk
+                                    for sign_x in (1, -1)
+                                    for sign_y in (1, -1)}
+            assert (0, -radius_y) in offsets
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Regression checks of the out-of-core tiled canvas
+"""
+import numpy as np
+
+from raster.canvas import TiledCanvas
+
+
+def lit_pixels(canvas):
+    return int(np.stack(list(canvas.rows())).any(axis=-1).sum())
+
+
+def test_clear_drops_old_pixels(tmp_path):
+    canvas = TiledCanvas(str(tmp_path / 'canvas.raw'), 64, 64, tile_size=32)
+    diagonal = np.arange(16)
+    canvas.plot_points(diagonal, diagonal)
+    assert lit_pixels(canvas) == 16
+    canvas.clear()
+    assert lit_pixels(canvas) == 0
+    canvas.plot_points(np.array([20, 21]), np.array([1, 1]))
+    assert lit_pixels(canvas) == 2
+
+
+def test_clear_to_color_then_black(tmp_path):
+    canvas = TiledCanvas(str(tmp_path / 'canvas.raw'), 64, 64, tile_size=32)
+    canvas.clear((10, 20, 30))
+    canvas.plot((1, 1))
+    canvas.clear()
+    canvas.plot((2, 2))
+    assert lit_pixels(canvas) == 1
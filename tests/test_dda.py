@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Regression checks of the integer DDA
+"""
+import math
+from fractions import Fraction
+
+from dda.dda import Point, dda, dda_fixed, dda_numpy
+
+
+def ideal_line(start, end):
+    xdiff, ydiff = end.x - start.x, end.y - start.y
+    steps = max(abs(xdiff), abs(ydiff))
+    return [Point(start.x + math.floor(Fraction(xdiff * i, max(steps, 1)) +
+                                       Fraction(1, 2)),
+                  start.y + math.floor(Fraction(ydiff * i, max(steps, 1)) +
+                                       Fraction(1, 2)))
+            for i in range(steps + 1)]
+
+
+def test_ties_round_up():
+    assert list(dda_fixed(Point(0, 0), Point(10, 7)))[5] == Point(5, 4)
+
+
+def test_exact_pixels():
+    start = Point(3, -4)
+    for xdiff in range(-20, 21):
+        for ydiff in range(-20, 21):
+            end = Point(start.x + xdiff, start.y + ydiff)
+            expected = ideal_line(start, end)
+            assert list(dda_fixed(start, end)) == expected
+            xs, ys = dda_numpy(start, end)
+            assert list(map(Point, xs.tolist(), ys.tolist())) == expected
+
+
+def test_modes_agree_on_halves():
+    assert list(dda(Point(0, 0), Point(4, 2))) == [
+        Point(0, 0), Point(1, 1), Point(2, 1), Point(3, 2), Point(4, 2)]
+    # Power of two steps keep the float accumulator exact, so the minor
+    # offsets hit every exact half
+    for steps in (2, 4, 8, 16, 32):
+        for delta in range(-steps, steps + 1):
+            for start, end in ((Point(1, 2), Point(1 + steps, 2 + delta)),
+                               (Point(1, 2), Point(1 - steps, 2 + delta)),
+                               (Point(1, 2), Point(1 + delta, 2 + steps)),
+                               (Point(1, 2), Point(1 + delta, 2 - steps))):
+                pixels = list(dda(start, end))
+                assert list(dda_fixed(start, end)) == pixels
+                xs, ys = dda_numpy(start, end)
+                assert list(map(Point, xs.tolist(), ys.tolist())) == pixels
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Checks of the rotation matrix cache
+"""
+import pytest
+
+from raster import rotation
+from transformations_3d.transformations import UnitVector
+
+
+def test_evicts_least_recently_used():
+    cache = rotation.RotationCache(max_matrices=2)
+    axis = UnitVector(0, 0, 1)
+    first = cache.matrix(0.5, axis)
+    cache.matrix(1.0, axis)
+    assert cache.matrix(0.5, axis) is first
+    cache.matrix(1.5, axis)
+    assert (axis.x, axis.y, axis.z, 1.0) not in cache
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_rejects_empty_cache():
+    with pytest.raises(ValueError):
+        rotation.RotationCache(max_matrices=0)
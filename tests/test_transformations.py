@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Checks of the in-place 2D transformations
+"""
+import numpy as np
+import pytest
+
+import transformations.transformations as transformations
+
+
+def test_int_out_rounds():
+    points = np.array([[1.4, 2.6], [-3.5, 4.0]])
+    out = np.zeros((2, 2), dtype=np.int32)
+    transformations.scale(points, 2, 1, out=out)
+    assert out.tolist() == [[3, 3], [-7, 4]]
+
+
+def test_int_out_overflow_raises():
+    points = np.array([[1e6, 2.0], [3.0, 4.0]])
+    with pytest.raises(OverflowError):
+        transformations.scale(points, 5000, 1,
+                              out=np.zeros((2, 2), dtype=np.int32))
+    with pytest.raises(OverflowError):
+        transformations.intify(np.array([[3e9, 1.0]]),
+                               out=np.zeros((1, 2), dtype=np.int32))
@@ -8,10 +8,24 @@ import math
 from collections import namedtuple
 import time
 import math
+import os
+import sys
+import numpy as np
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import framebuffer
+from raster.points import PointBuffer
+from raster.polygon import polygon_spans
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y'])
 
+# Number of points transformed at a time into an `out` buffer, which bounds
+# the temporary arrays
+CHUNK_SIZE = 1 << 16
+
 def sign(number):
     """
     Returns signum(`number`)
@@ -36,38 +50,278 @@ def irange(start, end, abs_delta=1):
     diff = end - start
     return range(start, end + sign(diff), sign(diff) * abs_delta)
 
-def translate(points, shift_x, shift_y):
-    try:
-        iter_points = iter(points)
-    except TypeError:
-        iter_points = iter((points,))
-    for point in iter_points:
-        yield Point(point.x + shift_x, point.y + shift_y)
-
-def scale(points, scale_x, scale_y):
-    try:
-        iter_points = iter(points)
-    except TypeError:
-        iter_points = iter((points,))
-    for point in iter_points:
-        yield Point(point.x * scale_x, point.y * scale_y)
-
-def rotate(points, angle):
-    try:
-        iter_points = iter(points)
-    except TypeError:
-        iter_points = iter((points,))
-    for point in iter_points:
-        yield Point(math.cos(angle) * point.x - math.sin(angle) * point.y,
-                    math.sin(angle) * point.x + math.cos(angle) * point.y)
-
-def intify(points):
-    try:
-        iter_points = iter(points)
-    except TypeError:
-        iter_points = iter((points,))
-    for point in iter_points:
-        yield Point(int(round(point.x)), int(round(point.y)))
+def iter_points(points):
+    """
+    Returns an iterator over `points`, which can be a single 'Point()' or an
+    iterable of 'Point()'s
+    """
+    if isinstance(points, Point):
+        return iter((points,))
+    return iter(points)
+
+class Affine2D(object):
+    """
+    A 2D affine transformation as a 3 x 3 homogeneous `matrix` acting on
+    column vectors (x, y, 1). The chaining methods return a new transformation
+    that applies the current one first and then theirs, e.g.
+        Affine2D().scale(2, 2).rotate(angle).translate(10, 0)
+    is a single matrix that scales, then rotates, then translates.
+    """
+    __slots__ = ('matrix',)
+
+    def __init__(self, matrix=None):
+        self.matrix = (np.identity(3) if matrix is None else
+                       np.array(matrix, dtype=np.float64).reshape(3, 3))
+
+    @classmethod
+    def translation(cls, shift_x, shift_y):
+        return cls([[1, 0, shift_x], [0, 1, shift_y], [0, 0, 1]])
+
+    @classmethod
+    def scaling(cls, scale_x, scale_y):
+        return cls([[scale_x, 0, 0], [0, scale_y, 0], [0, 0, 1]])
+
+    @classmethod
+    def rotation(cls, angle):
+        """
+        Returns the rotation by `angle` radians about the origin
+        """
+        cos, sin = math.cos(angle), math.sin(angle)
+        return cls([[cos, -sin, 0], [sin, cos, 0], [0, 0, 1]])
+
+    @classmethod
+    def shearing(cls, shear_x, shear_y):
+        """
+        Returns the shear moving x by `shear_x` * y and y by `shear_y` * x
+        """
+        return cls([[1, shear_x, 0], [shear_y, 1, 0], [0, 0, 1]])
+
+    @classmethod
+    def reflection(cls, angle=0):
+        """
+        Returns the reflection about the line through the origin at `angle`
+        radians (0 for the X axis, pi / 2 for the Y axis)
+        """
+        cos, sin = math.cos(2 * angle), math.sin(2 * angle)
+        return cls([[cos, sin, 0], [sin, -cos, 0], [0, 0, 1]])
+
+    def then(self, other):
+        """
+        Returns the transformation applying this one and then `other`
+        """
+        return Affine2D(other.matrix @ self.matrix)
+
+    def __matmul__(self, other):
+        """
+        Returns the transformation applying `other` and then this one, like
+        the product of their matrices
+        """
+        return Affine2D(self.matrix @ other.matrix)
+
+    def translate(self, shift_x, shift_y):
+        return self.then(Affine2D.translation(shift_x, shift_y))
+
+    def scale(self, scale_x, scale_y):
+        return self.then(Affine2D.scaling(scale_x, scale_y))
+
+    def rotate(self, angle):
+        return self.then(Affine2D.rotation(angle))
+
+    def shear(self, shear_x, shear_y):
+        return self.then(Affine2D.shearing(shear_x, shear_y))
+
+    def reflect(self, angle=0):
+        return self.then(Affine2D.reflection(angle))
+
+    def inverse(self):
+        return Affine2D(np.linalg.inv(self.matrix))
+
+    def is_integral(self):
+        """
+        Returns whether all entries of the matrix are whole numbers, so it
+        maps integer points to integer points
+        """
+        return bool(np.all(self.matrix == np.round(self.matrix)))
+
+    def apply(self, points, out=None):
+        """
+        Returns the (N, 2) float64 array of the (N, 2) array of `points`
+        transformed with a single matrix multiply, or if `out` is given
+        writes them into it instead (see `transform_into()`) and returns it
+        """
+        if out is not None:
+            return transform_into(self.matrix, points, out)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points @ self.matrix[:2, :2].T + self.matrix[:2, 2]
+
+    def transform(self, points):
+        """
+        Transforms `points`, in bulk into a new 'PointBuffer()' if it is one
+        (of ints if it and the matrix are integral, else of floats), else
+        lazily into a generator of 'Point()'s
+        """
+        if isinstance(points, PointBuffer):
+            xs, ys = points.arrays()
+            if points.typecode == 'i' and self.is_integral():
+                matrix = self.matrix.astype(np.int64)
+                xs, ys = xs.astype(np.int64), ys.astype(np.int64)
+            else:
+                matrix = self.matrix
+            return PointBuffer.from_arrays(
+                matrix[0, 0] * xs + matrix[0, 1] * ys + matrix[0, 2],
+                matrix[1, 0] * xs + matrix[1, 1] * ys + matrix[1, 2])
+        # Whole entries as ints, so integer points stay integers
+        (a, b, c), (d, e, f) = ([int(value) if value.is_integer() else value
+                                 for value in row.tolist()]
+                                for row in self.matrix[:2])
+        return (Point(a * point.x + b * point.y + c,
+                      d * point.x + e * point.y + f)
+                for point in iter_points(points))
+
+    def __eq__(self, other):
+        return (isinstance(other, Affine2D) and
+                np.array_equal(self.matrix, other.matrix))
+
+    def __repr__(self):
+        return 'Affine2D({})'.format(self.matrix[:2].tolist())
+
+def columns(points):
+    """
+    Returns the (xs, ys) arrays sharing memory with `points`, a
+    'PointBuffer()' or an (N, 2) array
+    """
+    if isinstance(points, PointBuffer):
+        return points.arrays()
+    points = np.asarray(points)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError('points must be an (N, 2) array or a PointBuffer')
+    return points[:, 0], points[:, 1]
+
+def check_range(values, dtype):
+    """
+    Raises OverflowError unless the float array `values` (rounded) fits in
+    the integer `dtype`
+    """
+    if not len(values):
+        return
+    limits = np.iinfo(dtype)
+    low, high = values.min(), values.max()
+    # Also false for NaN
+    if not (limits.min <= low and high <= limits.max):
+        raise OverflowError('{} to {} do not fit in {}'.format(
+            low, high, np.dtype(dtype).name))
+
+def transform_into(matrix, points, out):
+    """
+    Transforms `points` (a 'PointBuffer()' or an (N, 2) array) with the 3 x 3
+    `matrix` into the caller owned `out` (the same kinds, float64 or int32,
+    `points` itself to transform in place), `CHUNK_SIZE` points at a time,
+    rounding to the nearest integer in the same pass if `out` holds integers
+    Raises OverflowError (with the chunks before it already written) instead
+    of wrapping around when a rounded chunk does not fit in integer `out`
+    Returns `out`
+    """
+    xs, ys = columns(points)
+    out_xs, out_ys = columns(out)
+    if len(out_xs) != len(xs):
+        raise ValueError('out holds {} points, not {}'.format(len(out_xs),
+                                                              len(xs)))
+    rounding = out_xs.dtype.kind in 'iu'
+    (a, b, c), (d, e, f) = matrix[:2]
+    for first in range(0, len(xs), CHUNK_SIZE):
+        chunk = slice(first, first + CHUNK_SIZE)
+        # Copies of the chunk, so `out` may be `points`
+        x = xs[chunk].astype(np.float64)
+        y = ys[chunk].astype(np.float64)
+        new_x = a * x
+        new_x += b * y
+        new_x += c
+        y *= e
+        y += d * x
+        y += f
+        if rounding:
+            np.rint(new_x, out=new_x)
+            np.rint(y, out=y)
+            check_range(new_x, out_xs.dtype)
+            check_range(y, out_ys.dtype)
+        out_xs[chunk] = new_x
+        out_ys[chunk] = y
+    return out
+
+def translate(points, shift_x, shift_y, out=None):
+    """
+    Translates `points`, in bulk into a new 'PointBuffer()' if it is one
+    If `out` is given the points are written into it (see `transform_into()`)
+    """
+    if out is not None:
+        return transform_into(Affine2D.translation(shift_x, shift_y).matrix,
+                              points, out)
+    return Affine2D.translation(shift_x, shift_y).transform(points)
+
+def scale(points, scale_x, scale_y, out=None):
+    """
+    Scales `points`, in bulk into a new 'PointBuffer()' if it is one
+    If `out` is given the points are written into it (see `transform_into()`)
+    """
+    if out is not None:
+        return transform_into(Affine2D.scaling(scale_x, scale_y).matrix,
+                              points, out)
+    return Affine2D.scaling(scale_x, scale_y).transform(points)
+
+def rotate(points, angle, out=None):
+    """
+    Rotates `points` by `angle` radians about the origin, in bulk into a new
+    (float) 'PointBuffer()' if it is one
+    If `out` is given the points are written into it (see `transform_into()`)
+    """
+    if out is not None:
+        return transform_into(Affine2D.rotation(angle).matrix, points, out)
+    return Affine2D.rotation(angle).transform(points)
+
+def shear(points, shear_x, shear_y):
+    """
+    Shears `points` (see `Affine2D.shearing()`), in bulk into a new
+    'PointBuffer()' if it is one
+    """
+    return Affine2D.shearing(shear_x, shear_y).transform(points)
+
+def reflect(points, angle=0):
+    """
+    Reflects `points` about the line through the origin at `angle` radians,
+    in bulk into a new 'PointBuffer()' if it is one
+    """
+    return Affine2D.reflection(angle).transform(points)
+
+def intify(points, out=None):
+    """
+    Rounds `points` to integers, in bulk into a new (int) 'PointBuffer()' if
+    it is one
+    If `out` is given (a float64 or int32 'PointBuffer()' or (N, 2) array,
+    `points` itself to round in place) the points are rounded into it a chunk
+    at a time, and it is returned, raising OverflowError like
+    `transform_into()` if they do not fit in integer `out`
+    """
+    if out is not None:
+        xs, ys = columns(points)
+        out_xs, out_ys = columns(out)
+        if len(out_xs) != len(xs):
+            raise ValueError('out holds {} points, not {}'.format(
+                len(out_xs), len(xs)))
+        for first in range(0, len(xs), CHUNK_SIZE):
+            chunk = slice(first, first + CHUNK_SIZE)
+            new_x = np.rint(xs[chunk])
+            new_y = np.rint(ys[chunk])
+            if out_xs.dtype.kind in 'iu':
+                check_range(new_x, out_xs.dtype)
+                check_range(new_y, out_ys.dtype)
+            out_xs[chunk] = new_x
+            out_ys[chunk] = new_y
+        return out
+    if isinstance(points, PointBuffer):
+        xs, ys = points.arrays()
+        return PointBuffer.from_arrays(np.round(xs), np.round(ys), 'i')
+    return (Point(int(round(point.x)), int(round(point.y)))
+            for point in iter_points(points))
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -88,6 +342,10 @@ if __name__ == '__main__':
                         type=int,
                         default=1000,
                         help="Window size in pixels (equal width an height)")
+    parser.add_argument("--fill", "-f",
+                        action="store_true",
+                        help="Fill the polygons a row of pixels at a time "
+                             "instead of outlining them")
     args = parser.parse_args()
 
     # Init display
@@ -97,15 +355,19 @@ if __name__ == '__main__':
 
     points = [Point(*_) for _ in ((100,100), (200,200), (100,300))]
 
-    pygame.draw.polygon(surface, (255, 255, 255), points, 1)
-    pygame.draw.polygon(surface, (255, 0, 0),
-                        list(scale(points, 3.2, 1.2)), 1)
-    pygame.draw.polygon(surface, (0, 255, 0),
-                        list(translate(points, -50, 100)), 1)
-    pygame.draw.polygon(surface, (0, 0, 255),
-                        list(rotate(points, math.radians(10))), 1)
-
-    pygame.display.update()
+    polygons = (((255, 255, 255), points),
+                ((255, 0, 0), list(scale(points, 3.2, 1.2))),
+                ((0, 255, 0), list(translate(points, -50, 100))),
+                ((0, 0, 255), list(rotate(points, math.radians(10)))))
+    if args.fill:
+        target = framebuffer.make_target(surface)
+        for color, polygon in polygons:
+            target.plot_spans(polygon_spans(polygon), color)
+        target.present()
+    else:
+        for color, polygon in polygons:
+            pygame.draw.polygon(surface, color, polygon, 1)
+        pygame.display.update()
 
     # Wait till window quit
     while pygame.event.wait().type != pygame.QUIT:
@@ -8,6 +8,13 @@ import math
 from collections import namedtuple
 import time
 import math
+import os
+import sys
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from raster import rotation
 
 # A simple point class
 Point = namedtuple('Point', ['x', 'y', 'z'])
@@ -60,23 +67,20 @@ def scale(points, scale_x, scale_y, scale_z):
     for point in iter_points:
         yield Point(point.x * scale_x, point.y * scale_y, point.z * scale_z)
 
+def rotation_matrix(angle, axis):
+    """
+    Returns the 3 x 3 matrix (row tuples) of the rotation by `angle` radians
+    about the unit vector `axis` (Rodrigues' rotation formula), built once
+    per (axis, angle) and then taken from the rotation matrix cache
+    """
+    return rotation.rotation_matrix(angle, axis)
+
 def rotate(points, angle, axis):
     try:
         iter_points = iter(points)
     except TypeError:
         iter_points = iter((points,))
-    l = axis.x
-    m = axis.y
-    n = axis.z
-    matrix = [[l*l*(1-math.cos(angle)) + 1*math.cos(angle),
-               m*l*(1-math.cos(angle)) - n*math.sin(angle),
-               n*l*(1-math.cos(angle)) + m*math.sin(angle)],
-              [l*m*(1-math.cos(angle)) + n*math.sin(angle),
-               m*m*(1-math.cos(angle)) + 1*math.cos(angle),
-               n*m*(1-math.cos(angle)) - l*math.sin(angle)],
-              [l*n*(1-math.cos(angle)) - m*math.sin(angle),
-               m*n*(1-math.cos(angle)) + l*math.sin(angle),
-               n*n*(1-math.cos(angle)) + 1*math.cos(angle)]]
+    matrix = rotation_matrix(angle, axis)
     for point in iter_points:
         yield Point((matrix[0][0] * point.x +
                      matrix[0][1] * point.y +